@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+ANALYSIS_CACHE_PATH = Path(os.getenv("ANALYSIS_CACHE_PATH", "/tmp/uploads/analysis_cache.sqlite3"))
+ANALYSIS_CACHE_TTL_SEC = int(os.getenv("ANALYSIS_CACHE_TTL_SEC", str(7 * 24 * 3600)))  # 1 week
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", str(200 * 1024 ** 2)))  # 200 MB
+
+# bump when the analysis code changes in a way that should throw away old results
+ANALYSIS_CACHE_VERSION = 2
+
+
+def text_hash(text: Optional[str]) -> Optional[str]:
+    if text is None:
+        return None
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def prompt_version(*prompts) -> str:
+    """
+    Fingerprint of the prompts (and schemas) an endpoint uses, so editing any of them in
+    prompts.py automatically misses the old cache entries.
+    """
+    return text_hash(json.dumps(prompts, sort_keys=True, default=str))[:16]
+
+
+class AnalysisCache:
+    """
+    Persistent cache of endpoint results, stored in SQLite.
+
+    Entries are keyed by (video content hash, endpoint, model, prompt version, hashed inputs
+    such as outline/script), expire after `ttl_sec`, and the least recently read entries are
+    dropped once the cache grows past `max_bytes`. It also remembers which content hash each
+    video URL had, so a repeat request can be answered without touching the video at all.
+
+    Safe to use from worker threads (e.g. the outline embeddings): every access to the shared
+    connection goes through one lock.
+    """
+
+    def __init__(self, path: Path = ANALYSIS_CACHE_PATH, ttl_sec: int = ANALYSIS_CACHE_TTL_SEC,
+                 max_bytes: int = ANALYSIS_CACHE_MAX_BYTES):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self.db = sqlite3.connect(str(path), check_same_thread=False)
+        # sqlite3 leaves serializing a connection shared between threads to the caller
+        self._lock = threading.RLock()
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS results_accessed_at ON results (accessed_at);
+            CREATE TABLE IF NOT EXISTS video_hashes (
+                url TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL
+            );
+        """)
+
+    def make_key(self, video_hash: str, endpoint: str, model_id: str, prompts_version: str, **inputs) -> str:
+        inputs = {name: text_hash(value) for name, value in sorted(inputs.items())}
+        raw = json.dumps([ANALYSIS_CACHE_VERSION, video_hash, endpoint, model_id, prompts_version, inputs])
+        return text_hash(raw)
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self.db.execute("SELECT value, created_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            now = time.time()
+            if now - created_at > self.ttl_sec:
+                with self.db:
+                    self.db.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            with self.db:
+                self.db.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def set(self, key: str, value: dict):
+        data = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            with self.db:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO results (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, data, len(data), now, now),
+                )
+            self._evict()
+
+    def _evict(self):
+        with self._lock, self.db:
+            self.db.execute("DELETE FROM results WHERE created_at < ?", (time.time() - self.ttl_sec,))
+            total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for key, size in self.db.execute("SELECT key, size FROM results ORDER BY accessed_at").fetchall():
+                self.db.execute("DELETE FROM results WHERE key = ?", (key,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def video_hash(self, url: str) -> Optional[str]:
+        with self._lock:
+            row = self.db.execute("SELECT sha256 FROM video_hashes WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def remember_video_hash(self, url: str, sha256: str):
+        with self._lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO video_hashes (url, sha256) VALUES (?, ?)", (url, sha256))
+
+
+analysis_cache = AnalysisCache()
@@ -0,0 +1,67 @@
+# Startup benchmark for the analysis service.
+#
+# Measures how long `import transcribe` takes in a fresh interpreter, then starts uvicorn and
+# measures time until /healthz answers, time until /readyz reports every backend warm, and
+# the latency of the first request. Pass --video-url to time a real first analysis request.
+#
+#   python bench_startup.py [--port 9100] [--video-url https://...]
+import argparse
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def time_import(module: str) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def wait_for(url: str, start: float, timeout: float) -> float:
+    while time.perf_counter() - start < timeout:
+        try:
+            if httpx.get(url).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.TransportError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--video-url")
+    args = parser.parse_args()
+    base = f"http://127.0.0.1:{args.port}"
+
+    print(f"import transcribe:        {time_import('transcribe'):.3f}s")
+
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "transcribe:app", "--port", str(args.port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        print(f"start -> /healthz 200:    {wait_for(base + '/healthz', start, args.timeout):.3f}s")
+        print(f"start -> /readyz 200:     {wait_for(base + '/readyz', start, args.timeout):.3f}s")
+
+        t = time.perf_counter()
+        httpx.get(base + "/metrics/")
+        print(f"first request (/metrics): {time.perf_counter() - t:.3f}s")
+
+        if args.video_url:
+            t = time.perf_counter()
+            resp = httpx.post(base + "/analyze_transcript/", json={"video_url": args.video_url}, timeout=None)
+            print(f"first /analyze_transcript/: {time.perf_counter() - t:.3f}s (status {resp.status_code})")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+
+
+class EndpointLimiter:
+    """
+    Caps how many requests of one endpoint run at once. Requests over the cap wait their
+    turn, and the limiter keeps track of how many are waiting and for how long.
+    """
+
+    def __init__(self, name: str, max_concurrent: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self._sem = asyncio.Semaphore(max_concurrent)
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.total_wait_sec = 0.0
+        self.max_wait_sec = 0.0
+
+    @asynccontextmanager
+    async def slot(self):
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            await self._sem.acquire()
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - start
+        self.total_wait_sec += waited
+        self.max_wait_sec = max(self.max_wait_sec, waited)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._sem.release()
+
+    def metrics(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "avg_wait_sec": round(self.total_wait_sec / self.completed, 3) if self.completed else 0.0,
+            "max_wait_sec": round(self.max_wait_sec, 3),
+        }
+
+
+limiters: Dict[str, EndpointLimiter] = {}
+
+
+def get_limiter(name: str, default_limit: int = 4) -> EndpointLimiter:
+    """
+    Returns the limiter for an endpoint, creating it on first use. The cap can be overridden
+    with an env var, e.g. ANALYZE_TRANSCRIPT_CONCURRENCY=8.
+    """
+    if name not in limiters:
+        limit = int(os.getenv(f"{name.upper()}_CONCURRENCY", str(default_limit)))
+        limiters[name] = EndpointLimiter(name, limit)
+    return limiters[name]
+
+
+def limiter_metrics() -> dict:
+    return {name: limiter.metrics() for name, limiter in limiters.items()}
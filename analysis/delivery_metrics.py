@@ -0,0 +1,174 @@
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import ffmpeg                  # ffmpeg-python wrapper
+import numpy as np
+
+from segmenter import format_timestamp
+
+# rolling speech rate: words in a WPM_WINDOW_SEC window, sampled every WPM_STEP_SEC
+WPM_WINDOW_SEC = float(os.getenv("WPM_WINDOW_SEC", "30"))
+WPM_STEP_SEC = float(os.getenv("WPM_STEP_SEC", "5"))
+# gaps between words shorter than this are just articulation, not pauses
+MIN_PAUSE_SEC = 0.25
+LONG_PAUSE_SEC = float(os.getenv("LONG_PAUSE_SEC", "2"))
+PAUSE_BINS = [MIN_PAUSE_SEC, 0.5, 1, 2, 3, 5, np.inf]
+
+# the volume envelope only needs the low end of the spectrum, so audio is decoded at a low rate
+ENERGY_SAMPLE_RATE = 4000
+ENERGY_FRAME_SEC = 0.05        # frames used for silence detection
+ENERGY_POINT_SEC = 1.0         # resolution of the returned envelope
+# frames this far below the loud parts of the recording count as silence
+SILENCE_BELOW_DB = 30
+
+
+def decode_audio(video_path: Path, sample_rate: int = ENERGY_SAMPLE_RATE) -> np.ndarray:
+    """
+    Decodes the audio track with ffmpeg into mono int16 samples at `sample_rate`.
+    """
+    out, _ = (
+        ffmpeg
+        .input(str(video_path))
+        .output("pipe:", format="s16le", acodec="pcm_s16le", ac=1, ar=sample_rate)
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    return np.frombuffer(out, np.int16)
+
+
+def wpm_curve(starts: np.ndarray, duration_sec: float) -> dict:
+    """
+    Words per minute over a centred rolling window, sampled every WPM_STEP_SEC.
+    """
+    times = np.arange(0, duration_sec, WPM_STEP_SEC)
+    lo = np.clip(times - WPM_WINDOW_SEC / 2, 0, duration_sec)
+    hi = np.clip(times + WPM_WINDOW_SEC / 2, 0, duration_sec)
+    counts = np.searchsorted(starts, hi) - np.searchsorted(starts, lo)
+    wpm = np.divide(counts * 60, hi - lo, out=np.zeros(len(times)), where=hi > lo)
+    return {
+        "window_sec": WPM_WINDOW_SEC,
+        "step_sec": WPM_STEP_SEC,
+        "times": times.round(1).tolist(),
+        "wpm": wpm.round(1).tolist(),
+    }
+
+
+def pause_summary(pause_starts: np.ndarray, pause_lengths: np.ndarray) -> dict:
+    """
+    Histogram of pause lengths (over PAUSE_BINS) and where the long pauses are.
+    """
+    counts, _ = np.histogram(pause_lengths, bins=PAUSE_BINS)
+    labels = [f"{a:g}-{b:g}s" if np.isfinite(b) else f"{a:g}s+" for a, b in zip(PAUSE_BINS, PAUSE_BINS[1:])]
+    long = pause_lengths >= LONG_PAUSE_SEC
+    return {
+        "count": int(len(pause_lengths)),
+        "total_sec": round(float(pause_lengths.sum()), 1),
+        "histogram": dict(zip(labels, counts.tolist())),
+        "long_pauses": [
+            {"timestamp": format_timestamp(start), "start_sec": round(float(start), 2), "duration_sec": round(float(length), 2)}
+            for start, length in zip(pause_starts[long], pause_lengths[long])
+        ],
+    }
+
+
+def word_pauses(starts: np.ndarray, ends: np.ndarray):
+    gaps = starts[1:] - ends[:-1]
+    is_pause = gaps >= MIN_PAUSE_SEC
+    return ends[:-1][is_pause], gaps[is_pause]
+
+
+def frame_levels(samples: np.ndarray, frame: int) -> np.ndarray:
+    """
+    RMS level (dBFS) of consecutive frames of `frame` samples.
+    """
+    n = len(samples) // frame
+    frames = samples[:n * frame].reshape(n, frame).astype(np.float32) / 32768.0
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-5))
+
+
+def silent_frames(levels_db: np.ndarray) -> np.ndarray:
+    return levels_db < np.percentile(levels_db, 90) - SILENCE_BELOW_DB
+
+
+def silence_pauses(levels_db: np.ndarray, frame_sec: float):
+    """
+    Pauses from the audio alone: runs of frames well below the recording's loud parts.
+    """
+    if not len(levels_db):
+        return np.zeros(0), np.zeros(0)
+    silent = silent_frames(levels_db)
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    run_starts, run_ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    lengths = (run_ends - run_starts) * frame_sec
+    # silence before the first and after the last sound isn't a pause
+    inner = (run_starts > 0) & (run_ends < len(silent))
+    keep = inner & (lengths >= MIN_PAUSE_SEC)
+    return run_starts[keep] * frame_sec, lengths[keep]
+
+
+def estimated_word_starts(levels_db: np.ndarray, frame_sec: float, word_count: int) -> np.ndarray:
+    """
+    Word start times guessed from the audio alone: the transcript's words spread evenly over
+    the voiced (non-silent) frames, so the rate drops where the speaker pauses.
+    """
+    voiced = ~silent_frames(levels_db)
+    voiced_sec = np.cumsum(voiced) * frame_sec
+    if not word_count or not voiced_sec[-1]:
+        return np.zeros(0)
+    targets = (np.arange(word_count) + 0.5) / word_count * voiced_sec[-1]
+    return np.searchsorted(voiced_sec, targets) * frame_sec
+
+
+def energy_envelope(levels_db: np.ndarray) -> dict:
+    per_point = int(round(ENERGY_POINT_SEC / ENERGY_FRAME_SEC))
+    n = len(levels_db) // per_point
+    # average the power, not the decibels
+    power = 10 ** (levels_db[:n * per_point].reshape(n, per_point) / 10)
+    points = 10 * np.log10(power.mean(axis=1)) if n else np.zeros(0)
+    voiced = levels_db[levels_db >= np.percentile(levels_db, 90) - SILENCE_BELOW_DB] if len(levels_db) else levels_db
+    return {
+        "step_sec": ENERGY_POINT_SEC,
+        "db": points.round(1).tolist(),
+        # spread of the speaking volume, a flat delivery has a small range
+        "dynamic_range_db": round(float(np.percentile(voiced, 95) - np.percentile(voiced, 10)), 1) if len(voiced) else None,
+    }
+
+
+def delivery_metrics(word_timestamps: Optional[List[Dict]] = None, duration_sec: Optional[float] = None,
+                     video_path: Optional[Path] = None, word_count: Optional[int] = None) -> dict:
+    """
+    Pacing and volume over the whole rehearsal: a rolling WPM curve, pause histogram and
+    long-pause locations (from the word timestamps, or from silences in the audio when there
+    are none) and the volume envelope decoded from the audio.
+
+    Without word timestamps the WPM curve is estimated by spreading the transcript's
+    `word_count` words over the voiced parts of the audio, and marked "estimated".
+
+    CPU bound, so callers on the event loop should run it in a thread.
+    """
+    metrics: dict = {"wpm_curve": None, "pauses": None, "energy": None}
+
+    levels = None
+    if video_path is not None:
+        try:
+            levels = frame_levels(decode_audio(video_path), int(ENERGY_SAMPLE_RATE * ENERGY_FRAME_SEC))
+            metrics["energy"] = energy_envelope(levels)
+        except (ffmpeg.Error, OSError) as e:
+            detail = e.stderr.decode(errors="ignore")[-500:] if isinstance(e, ffmpeg.Error) else e
+            print(f"Could not decode audio for delivery metrics: {detail}")
+
+    if word_timestamps:
+        starts = np.fromiter((w["start"] for w in word_timestamps), np.float64, len(word_timestamps))
+        ends = np.fromiter((w["end"] for w in word_timestamps), np.float64, len(word_timestamps))
+        duration = duration_sec or float(ends[-1])
+        metrics["wpm_curve"] = wpm_curve(starts, duration)
+        metrics["pauses"] = pause_summary(*word_pauses(starts, ends))
+    elif levels is not None and len(levels):
+        metrics["pauses"] = pause_summary(*silence_pauses(levels, ENERGY_FRAME_SEC))
+        starts = estimated_word_starts(levels, ENERGY_FRAME_SEC, word_count or 0)
+        if len(starts):
+            duration = duration_sec or len(levels) * ENERGY_FRAME_SEC
+            metrics["wpm_curve"] = {**wpm_curve(starts, duration), "estimated": True}
+
+    return metrics
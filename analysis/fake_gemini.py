@@ -0,0 +1,107 @@
+# In-memory stand-in for the parts of the google-genai client the file cache uses
+# (`client.aio.files.upload` / `get` and `client.aio.models.generate_content`), so
+# GeminiFileCache can be exercised without an API key or network access.
+#
+# Running it checks the cache against the fake: one upload per video, a re-upload once the
+# remote file expires, and a re-upload plus one retry when Gemini answers 404 for a file.
+#
+#   python fake_gemini.py
+import asyncio
+import itertools
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Optional
+
+
+class FakeAPIError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class FakeFiles:
+    def __init__(self, processing_polls: int = 1):
+        self.processing_polls = processing_polls
+        self.files: Dict[str, SimpleNamespace] = {}
+        self.uploads = 0
+        self._ids = itertools.count(1)
+        self._polls: Dict[str, int] = {}
+
+    async def upload(self, file: str, config: Optional[dict] = None):
+        self.uploads += 1
+        name = f"files/{next(self._ids)}"
+        self.files[name] = SimpleNamespace(
+            name=name,
+            uri=f"https://fake.gemini/{name}",
+            mime_type=(config or {}).get("mime_type"),
+            expiration_time=datetime.now(timezone.utc) + timedelta(hours=48),
+            state=SimpleNamespace(name="PROCESSING" if self.processing_polls else "ACTIVE"),
+        )
+        self._polls[name] = self.processing_polls
+        return self.files[name]
+
+    async def get(self, name: str):
+        if name not in self.files:
+            raise FakeAPIError(404, f"{name} not found")
+        self._polls[name] -= 1
+        if self._polls[name] <= 0:
+            self.files[name].state = SimpleNamespace(name="ACTIVE")
+        return self.files[name]
+
+    def delete(self, name: str):
+        # what Gemini does to a file after 48 hours (or when it's deleted)
+        self.files.pop(name, None)
+
+
+class FakeModels:
+    def __init__(self, files: FakeFiles):
+        self._files = files
+
+    async def generate_content(self, model: str, contents: list, config=None):
+        for part in contents:
+            uri = getattr(getattr(part, "file_data", None), "file_uri", None)
+            if uri and uri.split("/", 3)[-1] not in self._files.files:
+                raise FakeAPIError(404, f"{uri} not found")
+        return SimpleNamespace(text="ok", usage_metadata=None)
+
+
+class FakeGeminiClient:
+    def __init__(self, processing_polls: int = 1):
+        files = FakeFiles(processing_polls)
+        self.aio = SimpleNamespace(files=files, models=FakeModels(files))
+
+
+async def check():
+    from gemini_files import GeminiFileCache
+    from llm_client import gemini_llm
+    from video_store import StoredVideo
+
+    client = FakeGeminiClient()
+    files = client.aio.files
+    cache = GeminiFileCache(lambda: client)
+    video = StoredVideo(url="https://example.com/fake.mp4", path=Path("fake.mp4"), sha256="0" * 64, size=0,
+                        mime_type="video/mp4")
+
+    async def use(part):
+        # like transcribe.generate, through gemini_llm
+        return await gemini_llm.call(lambda: client.aio.models.generate_content(model="fake", contents=["prompt", part]))
+
+    # the transcript and body language calls share one upload
+    await asyncio.gather(cache.with_file(video, use), cache.with_file(video, use))
+    assert files.uploads == 1, files.uploads
+
+    # an expired reference is uploaded again
+    cache._files[video.sha256].expires_at = datetime.now(timezone.utc)
+    await cache.with_file(video, use)
+    assert files.uploads == 2, files.uploads
+
+    # Gemini dropped the file: forget it, upload again and retry once
+    files.delete(cache._files[video.sha256].name)
+    assert (await cache.with_file(video, use)).text == "ok"
+    assert files.uploads == 3, files.uploads
+    print("gemini file cache ok")
+
+
+if __name__ == "__main__":
+    asyncio.run(check())
@@ -0,0 +1,75 @@
+import re
+from dataclasses import dataclass
+from typing import Iterable, List
+
+# fillers that are (almost) always fillers wherever they show up
+FILLER_PHRASES = [
+    "um", "umm", "uh", "uhh", "uhm", "er", "erm", "ah", "hmm", "mm",
+    "you know", "you see",
+    "or something", "and stuff", "or whatever", "you know what i mean",
+]
+
+# words that are only fillers in some contexts ("I like dogs" vs "it was, like, huge",
+# "what kind of car" vs "it's kind of hard"), these get checked by the model
+AMBIGUOUS_FILLER_PHRASES = [
+    "like", "so", "well", "right", "okay", "actually", "basically", "literally",
+    "kind of", "sort of", "i mean", "i guess",
+]
+
+WORD_RE = re.compile(r"[a-z']+")
+
+_END = object()  # marks the end of a phrase in the trie
+
+
+@dataclass
+class FillerMatch:
+    phrase: str
+    start: int       # character offsets into the transcript
+    end: int
+    ambiguous: bool
+
+
+class FillerMatcher:
+    """
+    Finds filler phrases with a word-level trie, so every phrase is matched in a single pass
+    over the transcript. At each word the longest phrase wins ("you know what i mean" over
+    "you know") and matches never overlap.
+    """
+
+    def __init__(self, phrases: Iterable[str] = FILLER_PHRASES,
+                 ambiguous_phrases: Iterable[str] = AMBIGUOUS_FILLER_PHRASES):
+        self.trie: dict = {}
+        for phrase in phrases:
+            self._add(phrase, ambiguous=False)
+        for phrase in ambiguous_phrases:
+            self._add(phrase, ambiguous=True)
+
+    def _add(self, phrase: str, ambiguous: bool):
+        node = self.trie
+        for word in phrase.lower().split():
+            node = node.setdefault(word, {})
+        node[_END] = (phrase.lower(), ambiguous)
+
+    def find(self, text: str) -> List[FillerMatch]:
+        words = [(m.group(), m.start(), m.end()) for m in WORD_RE.finditer(text.lower())]
+        matches = []
+        i = 0
+        while i < len(words):
+            node = self.trie
+            best, best_end = None, i
+            for j in range(i, len(words)):
+                node = node.get(words[j][0])
+                if node is None:
+                    break
+                if _END in node:
+                    best, best_end = node[_END], j
+            if best:
+                phrase, ambiguous = best
+                matches.append(FillerMatch(phrase, words[i][1], words[best_end][2], ambiguous))
+                i = best_end + 1
+            else:
+                i += 1
+        return matches
+
+
+filler_matcher = FillerMatcher()
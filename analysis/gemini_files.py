@@ -0,0 +1,116 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, TypeVar
+
+from llm_client import LLMError, gemini_files_llm, status_code
+from video_store import StoredVideo
+
+T = TypeVar("T")
+
+# Gemini keeps uploaded files for 48 hours; stop reusing a file a bit before it expires
+GEMINI_FILE_TTL = timedelta(hours=48)
+GEMINI_FILE_EXPIRY_MARGIN = timedelta(minutes=30)
+# give up on a video Gemini is still processing after this long
+GEMINI_FILE_PROCESSING_TIMEOUT_SEC = float(os.getenv("GEMINI_FILE_PROCESSING_TIMEOUT_SEC", "600"))
+# processing status is polled every POLL_START_SEC at first, backing off to POLL_MAX_SEC
+POLL_START_SEC = 1.0
+POLL_MAX_SEC = 10.0
+# what Gemini answers when a prompt refers to a file that was deleted or has expired
+FILE_GONE_CODES = {403, 404}
+
+
+@dataclass
+class RemoteFile:
+    name: str
+    uri: str
+    mime_type: str
+    expires_at: datetime
+
+    def usable(self) -> bool:
+        return datetime.now(timezone.utc) < self.expires_at - GEMINI_FILE_EXPIRY_MARGIN
+
+    def part(self):
+        from google.genai.types import Part
+        return Part.from_uri(file_uri=self.uri, mime_type=self.mime_type)
+
+
+class GeminiFileCache:
+    """
+    Uploads each video to Gemini once per content hash and hands out references to the
+    remote file, so the transcript call and the body language calls don't each resend it.
+
+    `get_client` returns the genai client to use; only `client.aio.files.upload` and
+    `client.aio.files.get` are called, so a local fake with those two methods is enough
+    to exercise it (see fake_gemini.py).
+    """
+
+    def __init__(self, get_client: Callable):
+        self.get_client = get_client
+        self._files: Dict[str, RemoteFile] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def part_for(self, video: StoredVideo):
+        # one lock per video so concurrent requests share one upload
+        lock = self._locks.setdefault(video.sha256, asyncio.Lock())
+        async with lock:
+            remote = self._files.get(video.sha256)
+            if remote is None or not remote.usable():
+                remote = await self._upload(video)
+                self._files[video.sha256] = remote
+        return remote.part()
+
+    async def with_file(self, video: StoredVideo, use: Callable[..., Awaitable[T]]) -> T:
+        """
+        Runs `use(part)` with the video's remote file. If Gemini says the file is gone (it
+        was deleted or expired early), the video is uploaded again and `use` retried once.
+        """
+        part = await self.part_for(video)
+        try:
+            return await use(part)
+        except LLMError as e:
+            if status_code(e.__cause__) not in FILE_GONE_CODES:
+                raise
+            print(f"Gemini file for {video.sha256} is gone, uploading it again")
+            self.forget(video)
+        return await use(await self.part_for(video))
+
+    def forget(self, video: StoredVideo):
+        """
+        Drops the remote reference, e.g. after Gemini reports the file is gone.
+        """
+        self._files.pop(video.sha256, None)
+
+    async def _upload(self, video: StoredVideo) -> RemoteFile:
+        """
+        Uploads the stored video straight from disk (the SDK sends it in chunks), so the
+        video never has to be read into memory, and waits for Gemini to process it. Goes
+        through gemini_files_llm (retries and breaker, but its own rate limit, so polling
+        doesn't hold up the model calls); raises LLMError if the upload fails or Gemini
+        doesn't finish processing in time.
+        """
+        client = self.get_client()
+        uploaded = await gemini_files_llm.call(
+            lambda: client.aio.files.upload(file=str(video.path), config={"mime_type": video.mime_type})
+        )
+        # videos have to finish processing on Gemini's side before a prompt can use them
+        deadline = time.monotonic() + GEMINI_FILE_PROCESSING_TIMEOUT_SEC
+        delay = POLL_START_SEC
+        while uploaded.state and uploaded.state.name == "PROCESSING":
+            if time.monotonic() > deadline:
+                raise LLMError(f"Gemini still processing the video after {GEMINI_FILE_PROCESSING_TIMEOUT_SEC:g}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 1.5, POLL_MAX_SEC)
+            uploaded = await gemini_files_llm.call(lambda: client.aio.files.get(name=uploaded.name))
+        if uploaded.state and uploaded.state.name == "FAILED":
+            raise LLMError("Gemini could not process the video")
+
+        expires_at = uploaded.expiration_time or datetime.now(timezone.utc) + GEMINI_FILE_TTL
+        return RemoteFile(
+            name=uploaded.name,
+            uri=uploaded.uri,
+            mime_type=uploaded.mime_type or video.mime_type,
+            expires_at=expires_at,
+        )
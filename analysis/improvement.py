@@ -0,0 +1,110 @@
+import os
+from typing import Dict, Optional
+
+import httpx
+from fastapi import HTTPException
+
+# the backend service owns the MongoDB speech/rehearsal data
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+
+# how much of the previous body language feedback goes into the prompt
+MAX_PREVIOUS_POINTS = 8
+MAX_POINT_CHARS = 160
+
+
+async def fetch_rehearsal(rehearsal_id: str) -> dict:
+    """
+    Loads a stored rehearsal (with its deliveryAnalysis / contentAnalysis) from the backend.
+    """
+    async with httpx.AsyncClient(base_url=BACKEND_URL) as http_client:
+        resp = await http_client.get(f"/rehearsal/{rehearsal_id}")
+    data = resp.json() if resp.status_code == 200 else {}
+    # the backend answers missing rehearsals with an error body, not an HTTP error
+    if data.get("code") != 200:
+        raise HTTPException(404, f"Rehearsal {rehearsal_id} not found")
+    return data
+
+
+def rehearsal_content(rehearsal: dict) -> Dict[str, Optional[str]]:
+    """
+    The outline / script the rehearsal was analysed against, as analysis inputs.
+    """
+    content = rehearsal.get("content") or {}
+    return {
+        "outline": content.get("text") if content.get("type") == "outline" else None,
+        "script": content.get("text") if content.get("type") == "script" else None,
+    }
+
+
+def outline_coverage(content_analysis: Optional[dict]) -> Optional[dict]:
+    """
+    How many outline points were covered (pros) vs missed or weak (cons).
+    """
+    if not content_analysis:
+        return None
+    covered = len(content_analysis.get("pros", []))
+    missed = len(content_analysis.get("cons", []))
+    total = covered + missed
+    return {
+        "covered": covered,
+        "missed": missed,
+        "coverage": round(covered / total, 2) if total else None,
+        "missed_points": [c.get("outline_point") for c in content_analysis.get("cons", [])],
+    }
+
+
+def _delta(before, after):
+    if before is None or after is None:
+        return None
+    return round(after - before, 2)
+
+
+def improvement_deltas(previous: dict, current: dict) -> dict:
+    """
+    Deterministic before/after numbers between the previous rehearsal's stored analysis
+    (deliveryAnalysis + contentAnalysis) and the current transcript analysis.
+    """
+    prev_fillers = previous.get("filler_words") or {}
+    cur_fillers = current.get("filler_words") or {}
+
+    prev_coverage = outline_coverage(previous.get("content_analysis"))
+    cur_coverage = outline_coverage(current.get("content_analysis"))
+
+    return {
+        "speech_rate_wpm": {
+            "before": previous.get("speech_rate_wpm"),
+            "after": current.get("speech_rate_wpm"),
+            "delta": _delta(previous.get("speech_rate_wpm"), current.get("speech_rate_wpm")),
+        },
+        "filler_words": {
+            "before": sum(prev_fillers.values()),
+            "after": sum(cur_fillers.values()),
+            "delta": sum(cur_fillers.values()) - sum(prev_fillers.values()),
+            "by_word": {
+                word: cur_fillers.get(word, 0) - prev_fillers.get(word, 0)
+                for word in sorted(set(prev_fillers) | set(cur_fillers))
+            },
+        },
+        "outline_coverage": {
+            "before": prev_coverage and prev_coverage["coverage"],
+            "after": cur_coverage and cur_coverage["coverage"],
+            "delta": _delta(prev_coverage and prev_coverage["coverage"], cur_coverage and cur_coverage["coverage"]),
+            "still_missed": cur_coverage["missed_points"] if cur_coverage else None,
+        },
+    }
+
+
+def improvement_summary(body_language: Optional[dict], deltas: dict) -> dict:
+    """
+    Compact structured summary of the previous rehearsal for the model: its body language
+    issues, trimmed, plus the deltas already computed locally.
+    """
+    cons = (body_language or {}).get("cons", [])[:MAX_PREVIOUS_POINTS]
+    pros = (body_language or {}).get("pros", [])[:MAX_PREVIOUS_POINTS]
+    return {
+        "previous_issues": [c.get("description", "")[:MAX_POINT_CHARS] for c in cons],
+        "previous_strengths": [p.get("description", "")[:MAX_POINT_CHARS] for p in pros],
+        "speech_rate_wpm_change": deltas["speech_rate_wpm"]["delta"],
+        "filler_word_change": deltas["filler_words"]["delta"],
+        "outline_coverage_change": deltas["outline_coverage"]["delta"],
+    }
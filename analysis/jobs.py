@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# finished jobs are kept around this long so clients can still poll their results
+JOB_RETENTION_SEC = int(os.getenv("JOB_RETENTION_SEC", "3600"))
+
+
+@dataclass
+class Job:
+    id: str
+    request: Any
+    stages: List[str]
+    status: str = "queued"                     # queued -> running -> done / failed
+    stage_status: Dict[str, str] = field(default_factory=dict)
+    results: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    events: List[dict] = field(default_factory=list)
+    changed: asyncio.Condition = field(default_factory=asyncio.Condition)
+
+    def __post_init__(self):
+        self.stage_status = {stage: "pending" for stage in self.stages}
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def progress(self) -> float:
+        done = sum(1 for status in self.stage_status.values() if status in ("done", "skipped"))
+        return round(done / len(self.stages), 2) if self.stages else 1.0
+
+    def snapshot(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": self.progress(),
+            "stages": self.stage_status,
+            "results": self.results,
+            "error": self.error,
+        }
+
+    async def _emit(self, event: dict):
+        self.events.append(event)
+        async with self.changed:
+            self.changed.notify_all()
+
+    async def start_stage(self, stage: str):
+        self.stage_status[stage] = "running"
+        await self._emit({"type": "stage_started", "stage": stage, "progress": self.progress()})
+
+    async def finish_stage(self, stage: str, results: Optional[dict] = None):
+        self.stage_status[stage] = "done"
+        self.results.update(results or {})
+        await self._emit({"type": "stage_done", "stage": stage, "progress": self.progress(), "results": results or {}})
+
+    async def finish(self, error: Optional[str] = None):
+        self.status = "failed" if error else "done"
+        self.error = error
+        self.finished_at = time.time()
+        for stage, status in self.stage_status.items():
+            if status == "pending":
+                self.stage_status[stage] = "skipped"
+        await self._emit({"type": self.status, **self.snapshot()})
+
+
+class JobQueue:
+    """
+    In-process queue of long-running analysis jobs.
+
+    `submit` returns a job right away; a pool of worker tasks picks jobs up and runs them
+    with `run_job(job)`, which reports per-stage progress and partial results through
+    `job.start_stage` / `job.finish_stage`. Clients poll `snapshot()` or follow `events()`.
+    """
+
+    def __init__(self, run_job: Callable[[Job], Awaitable[None]], workers: int = JOB_WORKERS):
+        self.run_job = run_job
+        self.workers = workers
+        self.jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, request: Any, stages: List[str]) -> Job:
+        self._prune()
+        job = new_job(request, stages)
+        self.jobs[job.id] = job
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    async def events(self, job: Job) -> AsyncIterator[dict]:
+        """
+        Yields every event of the job, starting from the first, until it finishes.
+        """
+        sent = 0
+        while True:
+            async with job.changed:
+                await job.changed.wait_for(lambda: len(job.events) > sent or job.finished)
+            while sent < len(job.events):
+                yield job.events[sent]
+                sent += 1
+            if job.finished:
+                return
+
+    async def run(self, job: Job):
+        """
+        Runs a job to completion, recording failures on the job instead of raising.
+        Also used directly for jobs that are streamed back without going through the queue.
+        """
+        job.status = "running"
+        try:
+            await self.run_job(job)
+        except asyncio.CancelledError:
+            await job.finish("cancelled")
+            raise
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            print(f"Job {job.id} failed: {detail}")
+            await job.finish(detail)
+        else:
+            await job.finish()
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self.run(job)
+            finally:
+                self._queue.task_done()
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SEC
+        for job_id, job in list(self.jobs.items()):
+            if job.finished and job.finished_at < cutoff:
+                del self.jobs[job_id]
+
+
+def new_job(request: Any, stages: List[str]) -> Job:
+    return Job(id=uuid.uuid4().hex, request=request, stages=stages)
+
+
+def sse_event(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
@@ -0,0 +1,196 @@
+import asyncio
+import os
+import random
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# requests per minute allowed by each provider (set to your account's limits)
+OPENAI_RPM = float(os.getenv("OPENAI_RPM", "500"))
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "60"))
+# file uploads and processing-status polls, limited separately so they don't use up GEMINI_RPM
+GEMINI_FILES_RPM = float(os.getenv("GEMINI_FILES_RPM", "120"))
+OPENAI_TIMEOUT_SEC = float(os.getenv("OPENAI_TIMEOUT_SEC", "60"))
+# video calls take much longer than text ones
+GEMINI_TIMEOUT_SEC = float(os.getenv("GEMINI_TIMEOUT_SEC", "300"))
+
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+BACKOFF_BASE_SEC = 1.0
+BACKOFF_MAX_SEC = 30.0
+# this many failed calls in a row open the circuit for BREAKER_RESET_SEC
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SEC = float(os.getenv("LLM_BREAKER_RESET_SEC", "30"))
+
+RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError", "ServerError"}
+
+
+class LLMError(Exception):
+    """A model call failed for good (after retries), or its output couldn't be used."""
+
+
+class CircuitOpenError(LLMError):
+    """The provider has been failing, calls are refused until the breaker resets."""
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` requests per second on average, bursts of up to `capacity`.
+    `pause` stops everyone for a while, e.g. when the provider says to retry later.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failures` failed calls in a row and refuses calls for `reset_sec`; then one
+    trial call is let through (half open) and closes it again if it succeeds.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset_sec: float = BREAKER_RESET_SEC):
+        self.failures = failures
+        self.reset_sec = reset_sec
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_sec else "open"
+
+    def before_call(self, name: str) -> bool:
+        """
+        Raises CircuitOpenError if the call isn't allowed; returns whether it's the trial call.
+        """
+        state = self.state
+        if state == "open" or (state == "half_open" and self.trial_running):
+            raise CircuitOpenError(f"{name} is failing, not calling it for now")
+        if state == "half_open":
+            self.trial_running = True
+            return True
+        return False
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.trial_running = False
+        if self.opened_at is not None or self.consecutive_failures >= self.failures:
+            self.opened_at = time.monotonic()
+
+
+def status_code(e: BaseException) -> Optional[int]:
+    # openai errors carry `status_code`, google-genai ones `code`
+    code = getattr(e, "status_code", None) or getattr(e, "code", None)
+    return code if isinstance(code, int) else None
+
+
+def retry_after(e: BaseException) -> Optional[float]:
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(e: BaseException) -> bool:
+    if isinstance(e, asyncio.TimeoutError) or type(e).__name__ in RETRYABLE_ERRORS:
+        return True
+    code = status_code(e)
+    return code is not None and (code == 429 or code >= 500)
+
+
+class LLMClient:
+    """
+    Wraps every call to one provider with rate limiting (token bucket), a per-call timeout,
+    retries with jittered exponential backoff on rate limits / server errors / timeouts, and
+    a circuit breaker so a failing provider fails requests fast instead of piling them up.
+    """
+
+    def __init__(self, name: str, rpm: float, timeout_sec: float, max_retries: int = LLM_MAX_RETRIES):
+        self.name = name
+        self.timeout_sec = timeout_sec
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(rpm / 60, capacity=max(rpm / 60, 5))
+        self.breaker = CircuitBreaker()
+        self.calls = self.retries = self.failures = 0
+
+    async def call(self, make_call: Callable[[], Awaitable[T]], timeout_sec: Optional[float] = None) -> T:
+        """
+        Runs `make_call()` (a fresh request each attempt). Raises LLMError once it's given up.
+        """
+        trial = self.breaker.before_call(self.name)
+        self.calls += 1
+        try:
+            for attempt in range(self.max_retries + 1):
+                await self.bucket.acquire()
+                try:
+                    result = await asyncio.wait_for(make_call(), timeout_sec or self.timeout_sec)
+                except Exception as e:
+                    if not is_retryable(e) or attempt == self.max_retries:
+                        self.failures += 1
+                        if is_retryable(e):
+                            self.breaker.record_failure()
+                        else:
+                            # a bad request, the provider itself is fine
+                            self.breaker.record_success()
+                        raise LLMError(f"{self.name} call failed: {type(e).__name__}: {e}") from e
+                    delay = min(BACKOFF_MAX_SEC, BACKOFF_BASE_SEC * 2 ** attempt) * random.uniform(0.5, 1.0)
+                    wait = retry_after(e)
+                    if wait is not None:
+                        # the provider told us when to come back, hold every caller until then
+                        self.bucket.pause(wait)
+                        delay = max(delay, wait)
+                    self.retries += 1
+                    print(f"{self.name} call failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                else:
+                    self.breaker.record_success()
+                    return result
+        finally:
+            # a cancelled trial call records neither outcome, let the next call be the trial
+            if trial:
+                self.breaker.trial_running = False
+
+    def metrics(self) -> dict:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "circuit": self.breaker.state,
+        }
+
+
+openai_llm = LLMClient("openai", OPENAI_RPM, OPENAI_TIMEOUT_SEC)
+gemini_llm = LLMClient("gemini", GEMINI_RPM, GEMINI_TIMEOUT_SEC)
+gemini_files_llm = LLMClient("gemini_files", GEMINI_FILES_RPM, GEMINI_TIMEOUT_SEC)
@@ -0,0 +1,163 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from analysis_cache import analysis_cache, text_hash
+from segmenter import format_timestamp
+
+# small CPU-friendly sentence embedding model, downloaded on first use
+OUTLINE_EMBEDDING_MODEL = os.getenv("OUTLINE_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# transcript windows compared against each outline point
+OUTLINE_WINDOW_WORDS = int(os.getenv("OUTLINE_WINDOW_WORDS", "40"))
+OUTLINE_WINDOW_STRIDE = int(os.getenv("OUTLINE_WINDOW_STRIDE", "20"))
+# cosine similarity above which a point counts as covered
+OUTLINE_MATCH_THRESHOLD = float(os.getenv("OUTLINE_MATCH_THRESHOLD", "0.5"))
+# how many outlines' embeddings are kept in memory (they're also kept in the analysis cache)
+OUTLINE_INDEX_SIZE = int(os.getenv("OUTLINE_INDEX_SIZE", "256"))
+
+BULLET_RE = re.compile(r"^\s*(?:[-*•–]|\d+[.)]|[a-zA-Z][.)])\s+")
+
+
+@lru_cache(maxsize=1)
+def get_embedding_model():
+    # imported here so torch is only loaded by the first outline analysis (or the warm-up)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(OUTLINE_EMBEDDING_MODEL, device="cpu")
+
+
+def embed(texts: List[str]) -> np.ndarray:
+    """
+    Unit-length embeddings (one row per text), so a dot product is the cosine similarity.
+    """
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    vectors = get_embedding_model().encode(texts, batch_size=64, normalize_embeddings=True)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def outline_points(outline: str) -> List[str]:
+    """
+    The outline's bullets, one per line, with bullet markers and numbering removed. An
+    outline written as a single paragraph is split into sentences instead.
+    """
+    points = [BULLET_RE.sub("", line).strip() for line in outline.splitlines()]
+    points = [p for p in points if p]
+    if len(points) == 1:
+        points = [s.strip() for s in re.split(r"(?<=[.!?;])\s+", points[0]) if s.strip()]
+    return points
+
+
+class OutlineIndex:
+    """
+    Embeddings of outline points, keyed by the outline text. A speech's outline rarely
+    changes between rehearsals, so it's embedded once: kept in memory (LRU) and persisted in
+    the analysis cache so a restart doesn't need to embed it again.
+
+    Used from worker threads (match_outline runs in one), so the LRU is guarded by a lock;
+    the embedding itself runs outside it.
+    """
+
+    def __init__(self, max_entries: int = OUTLINE_INDEX_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, outline: str) -> str:
+        return analysis_cache.make_key(text_hash(outline), "outline_embeddings", OUTLINE_EMBEDDING_MODEL, "")
+
+    def get(self, outline: str, points: List[str]) -> np.ndarray:
+        key = self._key(outline)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        stored = analysis_cache.get(key)
+        if stored is not None and stored.get("points") == points:
+            vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+        else:
+            vectors = embed(points)
+            analysis_cache.set(key, {"points": points, "embeddings": vectors.round(5).tolist()})
+
+        with self._lock:
+            self._entries[key] = vectors
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return vectors
+
+
+outline_index = OutlineIndex()
+
+
+def transcript_windows(transcript: str) -> List[Dict]:
+    """
+    Overlapping windows of OUTLINE_WINDOW_WORDS words, every OUTLINE_WINDOW_STRIDE words,
+    with the index of each window's first word.
+    """
+    words = transcript.split()
+    starts = range(0, max(len(words) - OUTLINE_WINDOW_WORDS, 0) + 1, OUTLINE_WINDOW_STRIDE)
+    windows = [{"start": i, "text": " ".join(words[i:i + OUTLINE_WINDOW_WORDS])} for i in starts]
+    # make sure the last words get a window of their own
+    if windows and windows[-1]["start"] + OUTLINE_WINDOW_WORDS < len(words):
+        last = len(words) - OUTLINE_WINDOW_WORDS
+        windows.append({"start": last, "text": " ".join(words[last:])})
+    return [w for w in windows if w["text"]]
+
+
+def match_outline(outline: str, transcript: str, duration_sec: Optional[float] = None,
+                  word_timestamps: Optional[List[Dict]] = None) -> Optional[dict]:
+    """
+    Matches every outline point to the transcript window most similar to it. Returns
+    per-point coverage (with where it was covered), the overall coverage and the points
+    covered out of the outline's order, or None if there's nothing to match.
+
+    CPU bound, so callers on the event loop should run it in a thread.
+    """
+    points = outline_points(outline)
+    windows = transcript_windows(transcript)
+    if not points or not windows:
+        return None
+
+    point_vectors = outline_index.get(outline, points)
+    window_vectors = embed([w["text"] for w in windows])
+    similarity = point_vectors @ window_vectors.T           # points x windows
+    best = similarity.argmax(axis=1)
+    score = similarity[np.arange(len(points)), best]
+    covered = score >= OUTLINE_MATCH_THRESHOLD
+
+    n_words = len(transcript.split())
+
+    def timestamp(word_index: int) -> str:
+        if word_timestamps and word_index < len(word_timestamps):
+            return format_timestamp(word_timestamps[word_index]["start"])
+        if duration_sec and n_words:
+            return format_timestamp(duration_sec * word_index / n_words)
+        return "n/a"
+
+    # a covered point is out of order if it comes before one the outline lists earlier
+    covered_at = np.where(covered, best, -1)
+    earlier_max = np.maximum.accumulate(np.concatenate(([-1], covered_at[:-1])))
+    out_of_order = covered & (best < earlier_max)
+
+    results = []
+    for i, point in enumerate(points):
+        window = windows[best[i]]
+        results.append({
+            "outline_point": point,
+            "covered": bool(covered[i]),
+            "similarity": round(float(score[i]), 2),
+            "timestamp": timestamp(window["start"]) if covered[i] else "missing",
+            "transcript_excerpt": window["text"] if covered[i] else None,
+            "out_of_order": bool(out_of_order[i]),
+        })
+
+    return {
+        "points": results,
+        "coverage": round(float(covered.mean()), 2),
+        "in_order": not out_of_order.any(),
+    }
@@ -1,3 +1,8 @@
+transcript_prompt = """
+        Transcribe the following video verbatim, including all filler words and pauses.
+        Return only the transcript text, no commentary, no summarization.
+        """
+
 content_analysis_outline_prompt = """
 You are a public speaking expert. I will provide:
 
@@ -51,6 +56,31 @@ Transcript:
 {transcript}
 """
 
+outline_feedback_prompt = """
+You are a public speaking expert. A speaker's outline was matched against the transcript of their
+rehearsal. Below is each outline point, numbered, with whether it was `covered`, where (`timestamp`),
+the `transcript_excerpt` that covered it, and whether it came `out_of_order` relative to the outline.
+
+For **each** point, give brief feedback:
+  • covered points: a `suggestion` for how to deepen or clarify the coverage (optional, may be "")
+  • points that were not covered: the `issue` (why it matters that it's missing) and a `suggestion` for how to integrate it
+
+Return a JSON object like this, with one entry per point, using the numbers exactly as given:
+
+```json
+{{
+  "feedback": [
+    {{ "index": 0, "suggestion": "Good start—perhaps add one anecdote for emotional impact." }},
+    {{ "index": 1, "issue": "The roadmap was never mentioned.", "suggestion": "Add a section around minute 4 to cover the roadmap." }}
+  ]
+}}```
+
+Return **only** the JSON—no explanations, no additional text.
+
+Outline points:
+{points}
+"""
+
 content_analysis_script_prompt = """
 You are a public speaking analyst. I will provide you with two pieces of text:
 
@@ -112,6 +142,29 @@ Transcript:
 """
 
 
+script_differences_prompt = """
+You are a public speaking analyst. A speaker's delivered transcript was aligned word by word with their
+original script, and the passages below are where the two differ. Each difference has a number, a `type`
+(omission, addition or paraphrase), the `script_excerpt` and the `transcript_excerpt`.
+
+For **each** difference, write a brief `note` for the speaker: what changed, and whether it matters
+(e.g. a key point was skipped, an addition helped or hurt, a paraphrase kept or lost the meaning).
+
+Return a JSON object like this, with one entry per difference, using the numbers exactly as given:
+
+```json
+{{
+  "notes": [
+    {{ "index": 0, "note": "The line introducing the mission was skipped, so the talk lacks its framing." }}
+  ]
+}}```
+
+Return **only** the JSON—no explanations, no additional text.
+
+Differences:
+{differences}
+"""
+
 
 video_analysis_prompt = (
     "You are a public speaking coach. Watch the entire video from start to finish and analyze the speaker’s nonverbal performance, focusing on:\n"
@@ -159,3 +212,20 @@ Organize your output as a JSON object named “improvements” like this:
 It is very important that timestamps be in MM:SS format, please follow this.
 """
 
+video_improvement_summary_prompt = """
+You are a public speaking coach. Below is a compact summary of the speaker's previous rehearsal:
+the body language issues and strengths you pointed out last time, and how their pace, filler words
+and outline coverage have changed since (already measured, do not re-estimate them):
+{summary}
+
+Watch the entire new video from start to finish. For each previous issue, check whether the speaker has
+improved on it. Focus on nonverbal performance (body language, eye contact, facial expressions, posture).
+
+- Add an entry to `pros` for each improvement: what changed vs. last time and why it's better.
+- Add an entry to `cons` for each previous issue that is still present, and for any new issue.
+
+Every entry needs a `timestamp` (one or more MM:SS marks, comma separated) and a `description`.
+
+It is very important that timestamps be in MM:SS format, please follow this.
+"""
+
@@ -0,0 +1,100 @@
+import re
+from bisect import bisect_right
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+
+from segmenter import format_timestamp, normalize_word
+
+TOKEN_RE = re.compile(r"\S+")
+
+# differences shorter than this (on both sides) are slips, not worth reporting
+MIN_SPAN_WORDS = 3
+# longest excerpt quoted back for a difference
+MAX_EXCERPT_WORDS = 40
+
+
+def tokenize(text: str) -> List[re.Match]:
+    return [m for m in TOKEN_RE.finditer(text) if normalize_word(m.group())]
+
+
+def script_sections(script: str) -> List[tuple]:
+    """
+    Character spans of the script's sections: paragraphs if it has them, else sentences.
+    """
+    paragraphs = [m.span() for m in re.finditer(r"(?:[^\n]|\n(?!\s*\n))+", script) if m.group().strip()]
+    if len(paragraphs) > 1:
+        return paragraphs
+    return [m.span() for m in re.finditer(r"[^.!?]+[.!?]*", script) if m.group().strip()]
+
+
+def _excerpt(tokens: List[re.Match], start: int, end: int) -> Optional[str]:
+    if start >= end:
+        return None
+    words = [t.group() for t in tokens[start:min(end, start + MAX_EXCERPT_WORDS)]]
+    return " ".join(words) + (" …" if end - start > MAX_EXCERPT_WORDS else "")
+
+
+def align_script(script: str, transcript: str, duration_sec: Optional[float] = None,
+                 word_timestamps: Optional[List[Dict]] = None) -> dict:
+    """
+    Aligns the script and transcript word by word (normalized for case and punctuation) and
+    reports what was skipped (omissions), added (additions) and said differently
+    (paraphrases), plus overall coverage and per-section accuracy.
+
+    Timestamps come from `word_timestamps` when available, else are estimated from each
+    word's position in the transcript and the video duration.
+
+    CPU bound, so callers on the event loop should run it in a thread.
+    """
+    script_tokens = tokenize(script)
+    transcript_tokens = tokenize(transcript)
+    a = [normalize_word(t.group()) for t in script_tokens]
+    b = [normalize_word(t.group()) for t in transcript_tokens]
+
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    opcodes = matcher.get_opcodes()
+
+    def timestamp(transcript_index: int) -> str:
+        if word_timestamps and transcript_index < len(word_timestamps):
+            return format_timestamp(word_timestamps[transcript_index]["start"])
+        if duration_sec and b:
+            return format_timestamp(duration_sec * transcript_index / len(b))
+        return "n/a"
+
+    matched = [False] * len(a)
+    differences = {"omissions": [], "additions": [], "paraphrases": []}
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            matched[i1:i2] = [True] * (i2 - i1)
+            continue
+        if max(i2 - i1, j2 - j1) < MIN_SPAN_WORDS:
+            continue
+        kind = {"delete": "omissions", "insert": "additions", "replace": "paraphrases"}[tag]
+        differences[kind].append({
+            "type": kind[:-1],
+            "script_excerpt": _excerpt(script_tokens, i1, i2),
+            "transcript_excerpt": _excerpt(transcript_tokens, j1, j2),
+            # for omissions, where in the delivery the skipped text should have come
+            "timestamp": timestamp(j1),
+            "note": "",
+        })
+
+    # per-section accuracy: share of each section's words that were said as written
+    token_starts = [t.start() for t in script_tokens]
+    sections = []
+    for start, end in script_sections(script):
+        first, last = bisect_right(token_starts, start - 1), bisect_right(token_starts, end - 1)
+        if last > first:
+            sections.append({
+                "section": _excerpt(script_tokens, first, min(last, first + 8)),
+                "accuracy": round(sum(matched[first:last]) / (last - first), 2),
+            })
+
+    return {
+        **differences,
+        "alignment": {
+            "coverage": round(sum(matched) / len(a), 2) if a else None,
+            "similarity": round(matcher.ratio(), 2),
+            "sections": sections,
+        },
+    }
@@ -0,0 +1,196 @@
+import asyncio
+import os
+import re
+from dataclasses import replace
+from difflib import SequenceMatcher
+from typing import Awaitable, Callable, Dict, List, Tuple, TypeVar
+
+import ffmpeg                  # ffmpeg-python wrapper
+
+from video_store import StoredVideo, video_store
+from video_proxy import PROXY_CRF, PROXY_FPS
+
+# rehearsals longer than this are analysed in overlapping windows instead of as one blob
+SEGMENT_THRESHOLD_SEC = float(os.getenv("SEGMENT_THRESHOLD_SEC", str(15 * 60)))
+SEGMENT_WINDOW_SEC = float(os.getenv("SEGMENT_WINDOW_SEC", str(10 * 60)))
+SEGMENT_OVERLAP_SEC = float(os.getenv("SEGMENT_OVERLAP_SEC", "30"))
+SEGMENT_CONCURRENCY = int(os.getenv("SEGMENT_CONCURRENCY", "3"))
+
+T = TypeVar("T")
+Window = Tuple[float, float]   # (start, end) in seconds
+
+_locks: Dict[str, asyncio.Lock] = {}
+
+
+def plan_windows(duration: float, window: float = SEGMENT_WINDOW_SEC,
+                 overlap: float = SEGMENT_OVERLAP_SEC) -> List[Window]:
+    """
+    Splits [0, duration] into windows of `window` seconds, each overlapping the previous
+    one by `overlap` seconds. The last window ends exactly at `duration`.
+    """
+    windows, start = [], 0.0
+    while True:
+        end = min(start + window, duration)
+        windows.append((start, end))
+        if end >= duration:
+            return windows
+        start = end - overlap
+
+
+def cut_audio(src: str, dst: str, start: float, length: float):
+    # audio is re-encoded (cheap), which also makes the cut sample accurate
+    (
+        ffmpeg
+        .input(src, ss=start, t=length)
+        .output(dst, vn=None, acodec="aac", ac=1, ar=16000, audio_bitrate="48k")
+        .overwrite_output()
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+
+
+def cut_video(src: str, dst: str, start: float, length: float):
+    # re-encoded rather than stream-copied so the window starts exactly at `start` and the
+    # model's timestamps can be shifted back reliably; the source is the small proxy anyway
+    (
+        ffmpeg
+        .input(src, ss=start, t=length)
+        .output(dst, r=PROXY_FPS, vcodec="libx264", preset="veryfast", crf=PROXY_CRF,
+                acodec="aac", ac=1, audio_bitrate="48k", movflags="+faststart")
+        .overwrite_output()
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+
+
+async def get_segment(video: StoredVideo, window: Window, kind: str) -> StoredVideo:
+    """
+    Returns the audio-only ("audio") or video ("video") cut of `window`, made once and kept
+    next to the original in the video store so it's evicted along with it (and counts
+    towards the store's size limit).
+    """
+    start, end = window
+    tag = f"seg-{kind}-{start:.0f}-{end:.0f}"
+    # segment files are named after the original video's hash so the store evicts them together
+    base_hash = video.sha256.split(".")[0]
+    path = video.path.with_name(f"{base_hash}.{tag}.{'m4a' if kind == 'audio' else 'mp4'}")
+
+    lock = _locks.setdefault(path.name, asyncio.Lock())
+    async with lock:
+        if not path.exists():
+            tmp_path = path.with_name(path.name + ".part" + path.suffix)
+            cut = cut_audio if kind == "audio" else cut_video
+            try:
+                await asyncio.to_thread(cut, str(video.path), str(tmp_path), start, end - start)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+            tmp_path.replace(path)
+            video_store.track_derived(base_hash, path.stat().st_size)
+
+    return replace(
+        video,
+        path=path,
+        sha256=f"{video.sha256}.{tag}",
+        size=path.stat().st_size,
+        mime_type="audio/mp4" if kind == "audio" else "video/mp4",
+    )
+
+
+async def map_windows(video: StoredVideo, windows: List[Window], kind: str,
+                      analyze: Callable[[StoredVideo], Awaitable[T]]) -> List[T]:
+    """
+    Cuts every window and runs `analyze` on them in parallel, at most SEGMENT_CONCURRENCY at
+    a time. Results come back in window order.
+    """
+    limit = asyncio.Semaphore(SEGMENT_CONCURRENCY)
+
+    async def run(window: Window) -> T:
+        async with limit:
+            return await analyze(await get_segment(video, window, kind))
+
+    return await asyncio.gather(*(run(window) for window in windows))
+
+
+# TRANSCRIPTS
+
+def normalize_word(word: str) -> str:
+    # lowercase, punctuation stripped, so transcripts (and scripts) can be compared word by word
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def merge_transcripts(texts: List[str], overlap_words: int = 150) -> str:
+    """
+    Joins the transcripts of overlapping windows, dropping the text that was transcribed
+    twice. The end of what's merged so far is aligned with the start of the next window,
+    and the next window is cut in after the longest run of matching words.
+    """
+    merged: List[str] = []
+    for text in texts:
+        words = text.split()
+        if not merged:
+            merged = words
+            continue
+        tail, head = merged[-overlap_words:], words[:overlap_words]
+        match = SequenceMatcher(None, [normalize_word(w) for w in tail], [normalize_word(w) for w in head],
+                                autojunk=False).find_longest_match(0, len(tail), 0, len(head))
+        if match.size >= 3:
+            keep = len(merged) - len(tail) + match.a + match.size
+            merged = merged[:keep] + words[match.b + match.size:]
+        else:
+            merged += words
+    return " ".join(merged)
+
+
+# TIMESTAMPED FEEDBACK
+
+def parse_timestamp(timestamp: str) -> float:
+    """
+    "MM:SS" or "HH:MM:SS" -> seconds.
+    """
+    seconds = 0.0
+    for part in timestamp.strip().split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def format_timestamp(seconds: float) -> str:
+    # MM:SS, with minutes going past 59 for long videos, which is what the frontend expects
+    seconds = int(round(seconds))
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+def merge_observations(results: List[dict], windows: List[Window]) -> dict:
+    """
+    Merges per-window feedback ({"pros": [...], "cons": [...]} or {"improvements": [...]})
+    onto the global timeline. Each entry's timestamps are shifted by its window's start.
+    In an overlap, only the window whose middle is closer keeps the timestamp, so the
+    same moment isn't reported twice; entries left without timestamps are dropped. A list
+    that ends up empty is still returned, so the response keeps its shape.
+    """
+    merged: dict = {}
+    for result in results:
+        for key, entries in result.items():
+            if isinstance(entries, list):
+                merged.setdefault(key, [])
+    for i, (result, (start, end)) in enumerate(zip(results, windows)):
+        own_from = (start + windows[i - 1][1]) / 2 if i > 0 else 0.0
+        own_to = (end + windows[i + 1][0]) / 2 if i + 1 < len(windows) else float("inf")
+
+        for key, entries in result.items():
+            if not isinstance(entries, list):
+                merged.setdefault(key, entries)
+                continue
+            for entry in entries:
+                if not isinstance(entry, dict) or "timestamp" not in entry:
+                    merged.setdefault(key, []).append(entry)
+                    continue
+                kept = []
+                for raw in str(entry["timestamp"]).split(","):
+                    try:
+                        t = parse_timestamp(raw) + start
+                    except ValueError:
+                        continue
+                    if own_from <= t < own_to:
+                        kept.append(format_timestamp(t))
+                if kept:
+                    merged.setdefault(key, []).append({**entry, "timestamp": ", ".join(kept)})
+    return merged
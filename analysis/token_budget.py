@@ -0,0 +1,180 @@
+import os
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+# most prompt tokens a single text prompt may use; inputs are compressed to fit
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "12000"))
+# size of the pieces long inputs are cut into before compressing
+CHUNK_TOKENS = 400
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+@lru_cache(maxsize=4)
+def get_encoding(model: str):
+    # tiktoken is optional, without it tokens are estimated from the length
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    encoding = get_encoding(model)
+    if encoding is None:
+        # roughly 4 characters per token for English text
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+# USAGE
+
+class TokenUsage:
+    """
+    Running prompt / completion token totals per model and call label.
+    """
+
+    def __init__(self):
+        self.totals: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_sec": 0.0}
+        )
+
+    def record(self, model: str, label: str, prompt_tokens: Optional[int], completion_tokens: Optional[int],
+               elapsed_sec: float):
+        prompt_tokens, completion_tokens = prompt_tokens or 0, completion_tokens or 0
+        print(f"[tokens] {label} ({model}): {prompt_tokens} prompt + {completion_tokens} completion in {elapsed_sec:.2f}s")
+        totals = self.totals[f"{model}:{label}"]
+        totals["calls"] += 1
+        totals["prompt_tokens"] += prompt_tokens
+        totals["completion_tokens"] += completion_tokens
+        totals["total_sec"] += elapsed_sec
+
+    def metrics(self) -> dict:
+        return {key: {**totals, "total_sec": round(totals["total_sec"], 2)} for key, totals in self.totals.items()}
+
+
+token_usage = TokenUsage()
+
+
+# COMPRESSION
+
+def split_words(piece: str, max_tokens: int) -> List[str]:
+    """
+    Cuts a piece that's too long on its own (a transcript without punctuation, say) into
+    runs of whole words of at most `max_tokens`.
+    """
+    parts, current, current_tokens = [], [], 0
+    for word in piece.split():
+        # each word is counted once; with its leading space it tokenizes as it will in the run
+        tokens = count_tokens(" " + word)
+        if current and current_tokens + tokens > max_tokens:
+            parts.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(word)
+        current_tokens += tokens
+    if current:
+        parts.append(" ".join(current))
+    return parts
+
+
+def chunk_text(text: str, max_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """
+    Cuts text into consecutive chunks of whole sentences (or lines) of about `max_tokens`.
+    Sentences longer than that are cut between words.
+    """
+    pieces = []
+    for piece in re.split(r"(?<=[.!?\n])\s+", text):
+        if not piece.strip():
+            continue
+        pieces.extend(split_words(piece, max_tokens) if count_tokens(piece) > max_tokens else [piece])
+    chunks, current, current_tokens = [], [], 0
+    for piece in pieces:
+        tokens = count_tokens(piece)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def keep_relevant_spans(text: str, max_tokens: int, reference: str = "") -> str:
+    """
+    Keeps the chunks of `text` sharing the most words with `reference` (or, without one, an
+    even spread of chunks), in their original order, with "[…]" where text was left out.
+    """
+    chunks = chunk_text(text)
+    reference_words = set(WORD_RE.findall(reference.lower()))
+
+    def relevance(i: int) -> float:
+        words = WORD_RE.findall(chunks[i].lower())
+        if reference_words and words:
+            return sum(w in reference_words for w in words) / len(words)
+        # no reference: prefer the start and end, then spread out from them
+        return -min(i, len(chunks) - 1 - i)
+
+    kept, used = set(), 0
+    for i in sorted(range(len(chunks)), key=relevance, reverse=True):
+        tokens = count_tokens(chunks[i])
+        if used + tokens > max_tokens:
+            continue
+        kept.add(i)
+        used += tokens
+
+    out, skipped = [], False
+    for i, chunk in enumerate(chunks):
+        if i in kept:
+            out.append(chunk)
+            skipped = False
+        elif not skipped:
+            out.append("[…]")
+            skipped = True
+    return " ".join(out)
+
+
+def allocate(sizes: Dict[str, int], available: int) -> Dict[str, int]:
+    """
+    Splits `available` tokens between inputs: small inputs keep everything, the rest share
+    what's left equally.
+    """
+    shares, remaining = {}, max(available, 0)
+    pending = sorted(sizes, key=sizes.get)
+    while pending:
+        fair = remaining // len(pending)
+        name = pending.pop(0)
+        shares[name] = min(sizes[name], fair)
+        remaining -= shares[name]
+    return shares
+
+
+def fit_inputs(template: str, inputs: Dict[str, str], budget: int = PROMPT_TOKEN_BUDGET) -> Dict[str, str]:
+    """
+    Returns `inputs` unchanged if `template.format(**inputs)` fits in `budget` tokens, else
+    cuts the inputs that don't fit their share down to the spans most relevant to the other
+    inputs (e.g. the parts of the transcript that talk about the outline).
+
+    Tokenizes every input, so callers on the event loop should run it in a thread.
+    """
+    overhead = count_tokens(template.format(**{name: "" for name in inputs}))
+    sizes = {name: count_tokens(text) for name, text in inputs.items()}
+    if overhead + sum(sizes.values()) <= budget:
+        return inputs
+
+    shares = allocate(sizes, budget - overhead)
+    fitted = {}
+    for name, text in inputs.items():
+        if sizes[name] <= shares[name]:
+            fitted[name] = text
+            continue
+        reference = " ".join(other for key, other in inputs.items() if key != name)
+        fitted[name] = keep_relevant_spans(text, shares[name], reference)
+        print(f"[tokens] compressed {name} from {sizes[name]} to {count_tokens(fitted[name])} tokens")
+    return fitted
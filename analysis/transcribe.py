@@ -1,29 +1,69 @@
 # app.py
 import shutil
 from typing import Optional
-import uuid
-from pathlib import Path
-from transcript_analysis import analyze_transcript
+from transcript_analysis import (
+    analyze_transcript,
+    get_openai_client,
+    speech_rate_wpm,
+    transcript_stages,
+    FILLER_PROMPT_TEMPLATE,
+    OPENAI_MODEL_ID,
+)
+from video_store import StoredVideo, video_store
+from concurrency import get_limiter, limiter_metrics
+from analysis_cache import analysis_cache, prompt_version
+from gemini_files import GeminiFileCache
+from video_proxy import get_proxy, PROXY_SETTINGS
+from improvement import (
+    fetch_rehearsal,
+    improvement_deltas,
+    improvement_summary,
+    rehearsal_content,
+)
+from segmenter import (
+    map_windows,
+    merge_observations,
+    merge_transcripts,
+    plan_windows,
+    SEGMENT_THRESHOLD_SEC,
+)
+from outline_coverage import get_embedding_model, OUTLINE_EMBEDDING_MODEL, OUTLINE_MATCH_THRESHOLD
+from whisper_backend import transcribe_with_whisper, get_whisper_model, WHISPER_MODEL_NAME
+from warmup import warmup
+from jobs import Job, JobQueue, new_job, sse_event
+from token_budget import token_usage
+from llm_client import CircuitOpenError, LLMError, gemini_files_llm, gemini_llm, openai_llm
 
 import os
 from dotenv import load_dotenv
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, HttpUrl
 
 import ffmpeg                  # ffmpeg-python wrapper
-import whisper                 # OpenAI Whisper local
-import httpx                   # for converting cloudinary URL; gemini does not take in URL directly
 
-from google import genai
-from google.genai.types import Part, GenerateContentConfig
 import uvicorn
 import json
-import mimetypes
-
-app = FastAPI()
+from json_repair import repair_json
+import asyncio
+import time
+from functools import lru_cache
+from contextlib import asynccontextmanager
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # SDK clients and models load in the background, so the server accepts requests (and
+    # answers /healthz) right away; /readyz turns 200 once the required backends are warm
+    warmup_task = asyncio.create_task(warmup.warm_up()) if os.getenv("WARMUP", "1") == "1" else None
+    job_queue.start()
+    yield
+    await job_queue.stop()
+    if warmup_task:
+        warmup_task.cancel()
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],
@@ -32,16 +72,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-model = whisper.load_model("small")   # or "base", "medium", "large"
-
 from prompts import (
+    transcript_prompt,
+    content_analysis_outline_prompt,
+    content_analysis_script_prompt,
+    script_differences_prompt,
+    outline_feedback_prompt,
     video_analysis_prompt,
-    video_improvement_prompt
+    video_improvement_prompt,
+    video_improvement_summary_prompt
 )
 
-UPLOAD_DIR = Path("/tmp/uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
-
 # for Google Gemini API
 PROJECT_ID = "publicspeaking-460317"
 LOCATION = "us-central1"
@@ -50,16 +91,63 @@ GEMINI_PRO_MODEL_ID = "gemini-2.0-flash"
 # load credentials from env file
 load_dotenv()
 
+# where transcripts come from: "gemini" (default) or "whisper" (local, offline, with word timestamps)
+TRANSCRIBE_BACKEND = os.getenv("TRANSCRIBE_BACKEND", "gemini")
+
 # analyze request schema
 class AnalyzeRequest(BaseModel):
     video_url: HttpUrl
     outline: Optional[str] = None
     script: Optional[str] = None
 
+@lru_cache(maxsize=1)
 def get_gemini_client():
-    # Initialize the Gemini client (adjust auth if needed)
+    # Initialize the Gemini client once per process (adjust auth if needed), so every request
+    # shares its HTTP connection pool
+    # imported here so the SDK is only loaded by the first Gemini call (or the warm-up)
+    from google import genai
     return genai.Client(api_key = os.environ["GEMINI_API_KEY"])#, vertexai = True, project=PROJECT_ID, location=LOCATION)
 
+# uploaded once per video, shared by the transcript and body language calls
+gemini_files = GeminiFileCache(get_gemini_client)
+
+async def call_gemini(label: str, contents: list, config=None):
+    client = get_gemini_client()
+    started = time.perf_counter()
+    response = await gemini_llm.call(lambda: client.aio.models.generate_content(
+        model=GEMINI_PRO_MODEL_ID,
+        contents=contents,
+        config=config,
+    ))
+
+    usage = getattr(response, "usage_metadata", None)
+    token_usage.record(
+        GEMINI_PRO_MODEL_ID, label,
+        usage.prompt_token_count if usage else None, usage.candidates_token_count if usage else None,
+        time.perf_counter() - started,
+    )
+    return response
+
+async def generate(label: str, contents: list, config=None, video: Optional[StoredVideo] = None):
+    """
+    One Gemini call, with gemini_llm's rate limiting, retries and circuit breaker. Token
+    usage is logged under `label`. With `video`, its uploaded file is appended to `contents`
+    (and uploaded again if Gemini has lost it).
+    """
+    try:
+        if video is None:
+            return await call_gemini(label, contents, config)
+        return await gemini_files.with_file(video, lambda part: call_gemini(label, [*contents, part], config))
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except LLMError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+warmup.register("openai", get_openai_client)
+warmup.register("gemini", get_gemini_client)
+warmup.register("whisper", get_whisper_model, required=TRANSCRIBE_BACKEND == "whisper")
+warmup.register("embeddings", get_embedding_model, required=False)
+
 def get_video_duration(file_path: str) -> float:
     """
     Returns the duration of a video (in seconds) using ffmpeg.probe.
@@ -74,86 +162,156 @@ def get_video_duration(file_path: str) -> float:
         print(f"Could not get video duration: {e}")
         return 0.0
 
-async def get_transcript_from_gemini(video_url: str) -> dict:
+async def get_transcript_from_gemini(video: StoredVideo) -> dict:
     """
-    Download video and get a verbatim transcript (with filler words) from Gemini.
+    Get a verbatim transcript (with filler words) from Gemini for an already downloaded video.
     """
-    async with httpx.AsyncClient() as http_client:
-        resp = await http_client.get(video_url)
-    if resp.status_code != 200:
-        raise HTTPException(400, f"Failed to fetch video: {resp.status_code}")
-    video_bytes = resp.content
-
-    mime_type = resp.headers.get("content-type")
-    if not mime_type:
-        mime_type, _ = mimetypes.guess_type(video_url)
-        if not mime_type or not mime_type.startswith("video/"):
-            mime_type = "application/octet-stream"
-
-    transcript_prompt = """
-        Transcribe the following video verbatim, including all filler words and pauses.
-        Return only the transcript text, no commentary, no summarization.
-        """
-
-    client = get_gemini_client()
-    response = client.models.generate_content(
-        model=GEMINI_PRO_MODEL_ID,
-        contents=[
-            transcript_prompt,
-            Part.from_bytes(data=video_bytes, mime_type=mime_type),
-        ]
-    )
+    response = await generate("transcript", [transcript_prompt], video=video)
     transcript_text = response.text.strip()
 
     return transcript_text
 
+async def get_transcript(video: StoredVideo, duration_sec: Optional[float] = None) -> dict:
+    """
+    Transcribes the video with the selected backend. Returns {"text", "words"}, where
+    "words" holds per-word timestamps on the Whisper path and is None for Gemini.
+    """
+    if TRANSCRIBE_BACKEND == "whisper":
+        return await transcribe_with_whisper(video.path)
+    # Gemini gets the small proxy (it keeps the audio track), the same file the body language
+    # calls use, so a short rehearsal is uploaded once and never at full resolution
+    proxy = await get_proxy(video)
+    if duration_sec and duration_sec > SEGMENT_THRESHOLD_SEC:
+        # long rehearsals: transcribe overlapping audio windows in parallel and stitch them
+        windows = plan_windows(duration_sec)
+        texts = await map_windows(proxy, windows, "audio", get_transcript_from_gemini)
+        return {"text": merge_transcripts(texts), "words": None}
+    return {"text": await get_transcript_from_gemini(proxy), "words": None}
+
+def lookup_cached(endpoint: str, url: str, model_id: str, prompts_version: str, **inputs) -> Optional[dict]:
+    """
+    The cached result for a video URL we've seen before, without downloading anything.
+    """
+    video_hash = analysis_cache.video_hash(url)
+    if not video_hash:
+        return None
+    return analysis_cache.get(analysis_cache.make_key(video_hash, endpoint, model_id, prompts_version, **inputs))
+
+async def run_cached(endpoint: str, url: str, compute, model_id: str, prompts_version: str, **inputs) -> dict:
+    """
+    Returns the cached result for this video, endpoint and inputs if there is one, otherwise
+    runs `compute(video)` on the stored video and caches what it returns, unless it's marked
+    "degraded" (a model call failed and it fell back), so the next request tries again.
+    """
+    # a URL we've seen before can be answered without downloading the video again
+    cached = lookup_cached(endpoint, url, model_id, prompts_version, **inputs)
+    if cached is not None:
+        return cached
+
+    async with video_store.open(url) as video:
+        analysis_cache.remember_video_hash(url, video.sha256)
+        key = analysis_cache.make_key(video.sha256, endpoint, model_id, prompts_version, **inputs)
+        cached = analysis_cache.get(key)
+        if cached is not None:
+            return cached
+        result = await compute(video)
+
+    if not result.get("degraded"):
+        analysis_cache.set(key, result)
+    return result
+
 ## CONTENT ANALYSIS
-@app.post("/analyze_transcript/")
-# takes in cloudinary URL, and gets transcript along with analysis
-async def upload_video(req: AnalyzeRequest):
-    # 1) Download video
-    url = str(req.video_url)
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url)
-    if resp.status_code != 200:
-        raise HTTPException(400, f"Failed to fetch video: {resp.status_code}")
-
-    # 2) Save to temp file
-    file_id = uuid.uuid4().hex
-    suffix = Path(req.video_url.path).suffix or ".mp4"
-    video_path = UPLOAD_DIR / f"{file_id}{suffix}"
-    with open(video_path, "wb") as f:
-        f.write(resp.content)
-
-    # get video duration for speech rate
-    duration_sec = get_video_duration(str(video_path))
-    print(f"Video duration: {duration_sec} seconds")
-
-    #get transcript from Gemini
-    transcript = await get_transcript_from_gemini(url)
-    # transcript = transcript.get("text", "").strip()
+TRANSCRIBER_ID = f"whisper-{WHISPER_MODEL_NAME}" if TRANSCRIBE_BACKEND == "whisper" else GEMINI_PRO_MODEL_ID
+TRANSCRIPT_MODEL_ID = f"{TRANSCRIBER_ID}+{OPENAI_MODEL_ID}"
+TRANSCRIPT_PROMPT_VERSION = prompt_version(
+    transcript_prompt, FILLER_PROMPT_TEMPLATE, content_analysis_outline_prompt, content_analysis_script_prompt,
+    script_differences_prompt, outline_feedback_prompt, OUTLINE_EMBEDDING_MODEL, OUTLINE_MATCH_THRESHOLD, PROXY_SETTINGS
+)
+# the transcript (and duration) are cached on their own too, so they can be replayed and
+# reused by analyses with a different outline or script
+TRANSCRIPT_TEXT_VERSION = prompt_version(transcript_prompt, PROXY_SETTINGS)
+
+def transcript_key(video_hash: str) -> str:
+    return analysis_cache.make_key(video_hash, "transcript", TRANSCRIBER_ID, TRANSCRIPT_TEXT_VERSION)
+
+async def transcribe_and_analyze(video: StoredVideo, outline: Optional[str] = None, script: Optional[str] = None) -> dict:
+    key = transcript_key(video.sha256)
+    result = analysis_cache.get(key)
+    if result is None:
+        # get video duration for speech rate (ffprobe runs in a thread so it doesn't block the loop)
+        duration_sec = await asyncio.to_thread(get_video_duration, str(video.path))
+        print(f"Video duration: {duration_sec} seconds")
+
+        #get transcript from Gemini (or local Whisper)
+        result = {"duration_sec": duration_sec, **await get_transcript(video, duration_sec)}
+        analysis_cache.set(key, result)
+    duration_sec, transcript = result["duration_sec"], result["text"]
     print(transcript)
 
-    # Clean up temp files
-    try:
-        video_path.unlink()
-    except:
-        pass
-
     # # 5. Get WPM and filler word count from transcript
     # delivery_analysis = analyze_transcript(result)
 
     # return JSONResponse({"transcript": transcript, "transcript_analysis": delivery_analysis})
     print("Video transcript gotten")
-    analysis = analyze_transcript(
+    return await analyze_transcript(
         transcript,
-        outline=req.outline,
-        script=req.script,
-        duration_sec = duration_sec
+        outline=outline,
+        script=script,
+        duration_sec = duration_sec,
+        word_timestamps = result["words"],
+        video_path = video.path
+    )
+
+async def cached_transcript_analysis(url: str, outline: Optional[str] = None, script: Optional[str] = None) -> dict:
+    # 1) Download video (or reuse the copy already in the video store), unless the
+    # same analysis is already cached
+    return await run_cached(
+        "analyze_transcript",
+        url,
+        lambda video: transcribe_and_analyze(video, outline, script),
+        model_id=TRANSCRIPT_MODEL_ID,
+        prompts_version=TRANSCRIPT_PROMPT_VERSION,
+        outline=outline,
+        script=script,
     )
 
+@app.post("/analyze_transcript/")
+# takes in cloudinary URL, and gets transcript along with analysis
+async def upload_video(req: AnalyzeRequest):
+    async with get_limiter("analyze_transcript").slot():
+        analysis = await cached_transcript_analysis(str(req.video_url), req.outline, req.script)
     return JSONResponse(analysis)
 
+TRANSCRIPT_RESULT_KEYS = [
+    "speech_rate_wpm", "filler_words", "filler_word_timestamps", "delivery_metrics", "content_analysis", "script_analysis"
+]
+
+@app.post("/analyze_transcript/stream")
+# same analysis as /analyze_transcript/, but streamed back as newline-delimited JSON: one
+# {"event", "data"} line per result (duration_sec, transcript, speech_rate_wpm, filler_words,
+# content_analysis, script_analysis) as soon as it's ready, then {"event": "done"}; a
+# {"event": "degraded", "data": true} line means a stage fell back and the result isn't cached.
+# Runs as an analysis job outside the queue, so a cached analysis is replayed the same way
+async def upload_video_stream(req: AnalyzeRequest):
+    async def stream():
+        job_req = JobRequest(**req.model_dump())
+        job = new_job(job_req, job_stages(job_req))
+        task = asyncio.create_task(job_queue.run(job))
+        try:
+            async for event in job_queue.events(job):
+                if event["type"] == "stage_done":
+                    for key, value in event["results"].items():
+                        yield json.dumps({"event": key, "data": value}) + "\n"
+                elif event["type"] == "failed":
+                    yield json.dumps({"event": "error", "detail": event["error"]}) + "\n"
+                elif event["type"] == "done":
+                    yield json.dumps({"event": "done"}) + "\n"
+        finally:
+            # stop the analysis if the client goes away
+            task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 # CONTENT ANALYSIS APIS
    
 ## BODY LANGUAGE ANALYSIS APIS
@@ -201,109 +359,329 @@ video_analysis_response_schema = {
 }
 
 # Config for deterministic JSON output
-json_config = GenerateContentConfig(
-    temperature=0.0,
-    max_output_tokens=8192,
-    response_mime_type="application/json",
-    response_schema=video_analysis_response_schema,
-)
-
-## INITIAL BODY LANGUAGE ANALYSIS API
-@app.post("/analyze_body_language/")
-# change so that this takes in a cloundinary URL, converts to a file, and then uploads to Gemini
-#https://res.cloudinary.com/drg6bi879/video/upload/v1747867042/videoplayback_vrwez9.mp4
-# ex. would take in a link like this
-async def analyze_body_language_init(req: AnalyzeRequest):
-    # Fetch the video bytes from the Cloudinary URL
-    url = str(req.video_url)
-    async with httpx.AsyncClient() as http_client:
-        resp = await http_client.get(url)
-    if resp.status_code != 200:
-        raise HTTPException(400, f"Failed to fetch video from URL: {resp.status_code}")
-    video_bytes = resp.content
-
-    # 3) Pick a mime type (prefer the reported one, else guess from extension)
-    mime_type = resp.headers.get("content-type")
-    if not mime_type:
-        mime_type, _ = mimetypes.guess_type(url)
-        if not mime_type or not mime_type.startswith("video/"):
-            mime_type = "application/octet-stream"
-
+json_config = {
+    "temperature": 0.0,
+    "max_output_tokens": 8192,
+    "response_mime_type": "application/json",
+    "response_schema": video_analysis_response_schema,
+}
 
-    # Call Gemini PRO
-    client = get_gemini_client()
-    try:
-        response = client.models.generate_content(
-            model=GEMINI_PRO_MODEL_ID,
-            contents=[
-                video_analysis_prompt,
-                Part.from_bytes(data=video_bytes, mime_type= mime_type),
-            ],
-            config=json_config,
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def analyze_body_language(video: StoredVideo, prompt: str) -> dict:
+    """
+    Runs body language analysis on the stored video. Gemini gets the small proxy copy of the
+    video rather than the full resolution upload, and long rehearsals are analysed in
+    overlapping windows in parallel, with the feedback timestamps shifted back onto the
+    full video's timeline.
+    """
+    proxy = await get_proxy(video)
+    duration_sec = await asyncio.to_thread(get_video_duration, str(video.path))
+    if duration_sec > SEGMENT_THRESHOLD_SEC:
+        windows = plan_windows(duration_sec)
+        results = await map_windows(proxy, windows, "video", lambda segment: generate_body_language(segment, prompt))
+        return merge_observations(results, windows)
+    return await generate_body_language(proxy, prompt)
+
+async def generate_body_language(video: StoredVideo, prompt: str) -> dict:
+    """
+    Sends a video to Gemini with a body language prompt and returns the parsed JSON.
+    """
+    # Call Gemini PRO (structured output, see json_config)
+    response = await generate("body_language", [prompt], config=json_config, video=video)
     
     # 5) Unwrap the parsed result
-    raw_wrapper = response.text
+    raw_wrapper = response.text or ""
 
     try:
         wrapper = json.loads(raw_wrapper)
-    except json.JSONDecodeError as e:
-        raise HTTPException(500, f"Could not parse outer JSON: {e}")
+    except json.JSONDecodeError:
+        # the odd truncated / slightly malformed reply is still usable
+        try:
+            wrapper = json.loads(repair_json(raw_wrapper))
+        except ValueError as e:
+            raise HTTPException(500, f"Could not parse outer JSON: {e}")
     
     return wrapper
 
+## INITIAL BODY LANGUAGE ANALYSIS API
+BODY_LANGUAGE_PROMPT_VERSION = prompt_version(video_analysis_prompt, video_analysis_response_schema, PROXY_SETTINGS)
+
+@app.post("/analyze_body_language/")
+# change so that this takes in a cloundinary URL, converts to a file, and then uploads to Gemini
+#https://res.cloudinary.com/drg6bi879/video/upload/v1747867042/videoplayback_vrwez9.mp4
+# ex. would take in a link like this
+async def analyze_body_language_init(req: AnalyzeRequest):
+    async with get_limiter("analyze_body_language").slot():
+        return await run_cached(
+            "analyze_body_language",
+            str(req.video_url),
+            lambda video: analyze_body_language(video, video_analysis_prompt),
+            model_id=GEMINI_PRO_MODEL_ID,
+            prompts_version=BODY_LANGUAGE_PROMPT_VERSION,
+        )
+
 
 ## IMPROVEMENT IN BODY ANALYSIS API
 @app.post("/analyze_body_language_improvement/")
 # this function will compare the feedback given before and analyze what the speaker did
 # better this time
-# inputs would be the video URL and the previous feedback
-async def analyze_body_language_improvement(req: AnalyzeRequest, feedback: str):
-    prompt = video_improvement_prompt.format(feedback=feedback)
+# inputs would be the video URL and either the previous feedback, or the id of the previous
+# rehearsal (preferred: its stored analysis is diffed locally and only a compact summary is sent)
+async def analyze_body_language_improvement(req: AnalyzeRequest, feedback: Optional[str] = None,
+                                            previous_rehearsal_id: Optional[str] = None):
+    if previous_rehearsal_id:
+        async with get_limiter("analyze_body_language_improvement").slot():
+            return await analyze_improvement_since(req, previous_rehearsal_id)
+    if not feedback:
+        raise HTTPException(422, "Either feedback or previous_rehearsal_id is required")
 
-    # Fetch the video bytes from the Cloudinary URL
-    url = str(req.video_url)
-    async with httpx.AsyncClient() as http_client:
-        resp = await http_client.get(url)
-    if resp.status_code != 200:
-        raise HTTPException(400, f"Failed to fetch video from URL: {resp.status_code}")
-    video_bytes = resp.content
-
-    # 3) Pick a mime type (prefer the reported one, else guess from extension)
-    mime_type = resp.headers.get("content-type")
-    if not mime_type:
-        mime_type, _ = mimetypes.guess_type(url)
-        if not mime_type or not mime_type.startswith("video/"):
-            mime_type = "application/octet-stream"
-    
-    # Call Gemini PRO
-    client = get_gemini_client()
-    try:
-        response = client.models.generate_content(
-            model=GEMINI_PRO_MODEL_ID,
-            contents=[
-                prompt,
-                Part.from_bytes(data=video_bytes, mime_type= mime_type),
-            ],
-            config=json_config,
+    prompt = video_improvement_prompt.format(feedback=feedback)
+    async with get_limiter("analyze_body_language_improvement").slot():
+        return await run_cached(
+            "analyze_body_language_improvement",
+            str(req.video_url),
+            lambda video: analyze_body_language(video, prompt),
+            model_id=GEMINI_PRO_MODEL_ID,
+            prompts_version=prompt_version(video_improvement_prompt, video_analysis_response_schema, PROXY_SETTINGS),
+            feedback=feedback,
         )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    # 5) Unwrap the parsed result
-    raw_wrapper = response.text
 
-    try:
-        wrapper = json.loads(raw_wrapper)
-    except json.JSONDecodeError as e:
-        raise HTTPException(500, f"Could not parse outer JSON: {e}")
-    
-    return wrapper
 
-    
+async def analyze_improvement_since(req: AnalyzeRequest, previous_rehearsal_id: str) -> dict:
+    """
+    Improvement mode against a stored rehearsal: WPM, filler and outline coverage deltas are
+    computed locally from the previous rehearsal's stored analysis and this video's (cached)
+    transcript analysis, and the model only gets a compact summary of what to look for.
+    """
+    previous = await fetch_rehearsal(previous_rehearsal_id)
+    delivery = previous.get("deliveryAnalysis") or {}
+    content_analysis = (previous.get("contentAnalysis") or {}).get("content_analysis")
+
+    # older rehearsals may not have stored delivery numbers; use the cached analysis of their video
+    if delivery.get("speech_rate_wpm") is None and previous.get("videoUrl"):
+        delivery = {**(lookup_cached(
+            "analyze_transcript", previous["videoUrl"], TRANSCRIPT_MODEL_ID, TRANSCRIPT_PROMPT_VERSION,
+            **rehearsal_content(previous),
+        ) or {}), **delivery}
+
+    outline = req.outline or rehearsal_content(previous)["outline"]
+    script = req.script or rehearsal_content(previous)["script"]
+    current = await cached_transcript_analysis(str(req.video_url), outline, script)
+
+    deltas = improvement_deltas({**delivery, "content_analysis": content_analysis}, current)
+    summary = improvement_summary(delivery.get("body_language_analysis"), deltas)
+    prompt = video_improvement_summary_prompt.format(summary=json.dumps(summary, indent=1))
+
+    feedback = await run_cached(
+        "analyze_body_language_improvement",
+        str(req.video_url),
+        lambda video: analyze_body_language(video, prompt),
+        model_id=GEMINI_PRO_MODEL_ID,
+        prompts_version=prompt_version(video_improvement_summary_prompt, video_analysis_response_schema, PROXY_SETTINGS),
+        summary=json.dumps(summary, sort_keys=True),
+    )
+    return {**feedback, "deltas": deltas}
+
+
+## ANALYSIS JOBS
+# long-running analysis in the background: submit returns a job id right away, and the client
+# polls /jobs/{id} or follows /jobs/{id}/events to get each stage's results as soon as it's ready
+
+class JobRequest(AnalyzeRequest):
+    body_language: bool = False
+
+def job_stages(req: JobRequest) -> list:
+    stages = ["download", "probe", "transcript", "filler", "delivery"]
+    if req.outline:
+        stages.append("content_analysis")
+    if req.script:
+        stages.append("script_analysis")
+    if req.body_language:
+        stages.append("body_language")
+    return stages
+
+# which results each stage reports, to replay a cached analysis stage by stage
+JOB_STAGE_KEYS = {
+    "probe": ["duration_sec"],
+    "transcript": ["transcript", "speech_rate_wpm"],
+    "filler": ["filler_words", "filler_word_timestamps"],
+    "delivery": ["delivery_metrics"],
+    "content_analysis": ["content_analysis"],
+    "script_analysis": ["script_analysis"],
+}
+TRANSCRIPT_STAGES = ("filler", "delivery", "content_analysis", "script_analysis")
 
-    
+def transcript_analysis_key(video_hash: str, req: AnalyzeRequest) -> str:
+    # the same key /analyze_transcript/ uses, so jobs and the endpoint share their results
+    return analysis_cache.make_key(
+        video_hash, "analyze_transcript", TRANSCRIPT_MODEL_ID, TRANSCRIPT_PROMPT_VERSION,
+        outline=req.outline, script=req.script,
+    )
+
+def body_language_key(video_hash: str) -> str:
+    return analysis_cache.make_key(video_hash, "analyze_body_language", GEMINI_PRO_MODEL_ID, BODY_LANGUAGE_PROMPT_VERSION)
+
+async def replay_stages(job: Job, stages: list, cached: dict):
+    for stage in stages:
+        await job.start_stage(stage)
+        await job.finish_stage(stage, {key: cached[key] for key in JOB_STAGE_KEYS.get(stage, []) if key in cached})
 
+async def cached_body_language(video: StoredVideo) -> dict:
+    key = body_language_key(video.sha256)
+    cached = analysis_cache.get(key)
+    if cached is None:
+        cached = await analyze_body_language(video, video_analysis_prompt)
+        analysis_cache.set(key, cached)
+    return cached
 
+async def run_analysis_job(job: Job):
+    """
+    download -> probe -> transcript -> filler / outline / script, with body language analysed
+    alongside the transcript stages once the video is downloaded. Results are read from and
+    written to the same cache entries as /analyze_transcript/ and /analyze_body_language/;
+    a fully cached job is replayed without downloading the video.
+    """
+    req = job.request
+    url = str(req.video_url)
+    async with get_limiter("analyze_transcript").slot():
+        video_hash = analysis_cache.video_hash(url)
+        if video_hash:
+            transcript = analysis_cache.get(transcript_key(video_hash))
+            cached = analysis_cache.get(transcript_analysis_key(video_hash, req))
+            body = analysis_cache.get(body_language_key(video_hash)) if req.body_language else None
+            if transcript is not None and cached is not None and (body is not None or not req.body_language):
+                # the same stages and results a fresh run reports
+                cached = {"duration_sec": transcript["duration_sec"], "transcript": transcript["text"], **cached}
+                await replay_stages(job, [stage for stage in job.stages if stage != "body_language"], cached)
+                if req.body_language:
+                    await job.start_stage("body_language")
+                    await job.finish_stage("body_language", {"body_language_analysis": body})
+                return
+
+        await job.start_stage("download")
+        async with video_store.open(url) as video:
+            analysis_cache.remember_video_hash(url, video.sha256)
+            await job.finish_stage("download")
+
+            body_task = None
+            if req.body_language:
+                await job.start_stage("body_language")
+                body_task = asyncio.create_task(cached_body_language(video))
+            try:
+                result = await transcribe_stages(job, video)
+                key = transcript_analysis_key(video.sha256, req)
+                cached = analysis_cache.get(key)
+                if cached is not None:
+                    await replay_stages(job, [stage for stage in job.stages if stage in TRANSCRIPT_STAGES], cached)
+                else:
+                    await analysis_stages(job, video, result)
+                    # cached in the same shape /analyze_transcript/ returns, unless a stage fell
+                    # back (then the next request tries again)
+                    if not job.results.get("degraded"):
+                        analysis_cache.set(key, {k: job.results[k] for k in TRANSCRIPT_RESULT_KEYS if k in job.results})
+            except BaseException:
+                if body_task and not body_task.done():
+                    body_task.cancel()
+                elif body_task and not body_task.cancelled() and body_task.exception():
+                    # the job fails with the other stage's error, but don't lose this one
+                    print(f"Body language analysis for job {job.id} failed: {body_task.exception()}")
+                raise
+
+            if body_task:
+                await job.finish_stage("body_language", {"body_language_analysis": await body_task})
+
+async def transcribe_stages(job: Job, video: StoredVideo) -> dict:
+    """
+    probe -> transcript, or both replayed from the cached transcript. Returns the transcript
+    entry ({"duration_sec", "text", "words"}).
+    """
+    key = transcript_key(video.sha256)
+    result = analysis_cache.get(key)
+    if result is None:
+        await job.start_stage("probe")
+        duration_sec = await asyncio.to_thread(get_video_duration, str(video.path))
+        await job.finish_stage("probe", {"duration_sec": duration_sec})
+
+        await job.start_stage("transcript")
+        result = {"duration_sec": duration_sec, **await get_transcript(video, duration_sec)}
+        analysis_cache.set(key, result)
+    else:
+        await job.start_stage("probe")
+        await job.finish_stage("probe", {"duration_sec": result["duration_sec"]})
+        await job.start_stage("transcript")
+    await job.finish_stage("transcript", {
+        "transcript": result["text"],
+        "speech_rate_wpm": speech_rate_wpm(result["text"], result["duration_sec"], result["words"]),
+    })
+    return result
+
+async def analysis_stages(job: Job, video: StoredVideo, result: dict):
+    req = job.request
+    for stage in job.stages:
+        if stage in TRANSCRIPT_STAGES:
+            await job.start_stage(stage)
+    async for stage, results in transcript_stages(
+        result["text"], req.outline, req.script, result["words"], result["duration_sec"], video.path
+    ):
+        await job.finish_stage(stage, results)
+
+job_queue = JobQueue(run_analysis_job)
+
+@app.post("/jobs/", status_code=202)
+# submit a video for analysis; returns a job id to poll
+async def submit_job(req: JobRequest):
+    job = job_queue.submit(req, job_stages(req))
+    return {
+        "job_id": job.id,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+    }
+
+@app.get("/jobs/{job_id}")
+# current status, per-stage progress and whatever results are ready so far
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job.snapshot()
+
+@app.get("/jobs/{job_id}/events")
+# server-sent events: one event per stage start/finish, ending with "done" or "failed"
+async def get_job_events(job_id: str):
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+
+    async def stream():
+        async for event in job_queue.events(job):
+            yield sse_event(event)
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+## HEALTH
+@app.get("/healthz")
+# the process is up and serving requests
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+# every backend this replica needs is loaded
+async def readyz():
+    status = warmup.status()
+    if not warmup.ready():
+        return JSONResponse({"ready": False, "backends": status}, status_code=503)
+    return {"ready": True, "backends": status}
+
+
+## METRICS
+@app.get("/metrics/")
+# per-endpoint concurrency and queueing numbers, model token usage per call type and the
+# model clients' retries / circuit breaker state
+async def get_metrics():
+    return {
+        "endpoints": limiter_metrics(),
+        "tokens": token_usage.metrics(),
+        "llm": {
+            "openai": openai_llm.metrics(), "gemini": gemini_llm.metrics(), "gemini_files": gemini_files_llm.metrics(),
+        },
+    }
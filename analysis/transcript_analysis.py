@@ -1,79 +1,301 @@
 import re
 import json
 from json_repair import repair_json
-import time
 #from ollama import Client
-from openai import OpenAI
 from dotenv import load_dotenv
 from collections import Counter
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from bisect import bisect_right
+from pathlib import Path
+import os
+import asyncio
+import time
+from contextlib import nullcontext
+from functools import lru_cache
 
 load_dotenv()
 
 FILLER_PROMPT_TEMPLATE = """
-You are given a portion of a spoken transcript. Your task is to extract only the **filler words or phrases** used in context.
+You are given numbered sentences from a spoken transcript. Your task is to extract only the **filler words or phrases** used in context in **each** sentence.
 
 Filler words are typically unnecessary pauses, hedges, or verbal crutches. Common examples include: "um", "uh", "like", "you know", "I guess", "so", "basically", "I mean", "sort of", etc.
 
-Output a JSON list in the following format:
+Output a JSON object in the following format, with one entry per sentence that contains filler words, using the sentence numbers exactly as given:
 
-[
-  {{ "filler_phrases": ["um", "like", "sort of", "yeah"] }}
-]
+{{
+  "results": [
+    {{ "index": 0, "filler_phrases": ["um", "like", "sort of"] }},
+    {{ "index": 3, "filler_phrases": ["yeah"] }}
+  ]
+}}
 
-If no filler words are found, return an empty list:
-[]
+Leave out sentences with no filler words. If no filler words are found at all, return:
+{{ "results": [] }}
 
 Return **only** the JSON—no explanations, no additional text.
 
-Transcript:
+Sentences:
 {text}
 """
 
+# whether context-dependent filler candidates get checked by the model (otherwise they're skipped)
+FILLER_LLM_FALLBACK = os.getenv("FILLER_LLM_FALLBACK", "1") == "1"
+
+# whether outline coverage is matched locally with embeddings (otherwise the model reads the
+# whole outline and transcript)
+OUTLINE_EMBEDDINGS = os.getenv("OUTLINE_EMBEDDINGS", "1") == "1"
+
+# below this share of the script said as written, alignment isn't meaningful and the model
+# compares the full script and transcript instead
+SCRIPT_ALIGNMENT_MIN_COVERAGE = 0.2
+# at most this many script differences get a note from the model
+MAX_NOTED_DIFFERENCES = 25
+
+# how many prompt tokens worth of sentences get packed into a single filler detection call
+FILLER_WINDOW_TOKENS = 1500
+
+from filler_words import FillerMatch, filler_matcher
+from script_alignment import align_script
+from outline_coverage import match_outline
+from delivery_metrics import delivery_metrics
+from token_budget import count_tokens, fit_inputs, token_usage
+from llm_client import LLMError, openai_llm
 from prompts import (
     content_analysis_outline_prompt,
-    content_analysis_script_prompt
+    content_analysis_script_prompt,
+    outline_feedback_prompt,
+    script_differences_prompt
 )
 
 #client = Client()
-client = OpenAI()
+@lru_cache(maxsize=1)
+def get_openai_client():
+    # imported here so the SDK is only loaded by the first model call (or the warm-up)
+    from openai import AsyncOpenAI
+    # retries are done by llm_client, which also rate limits and backs off across requests
+    return AsyncOpenAI(max_retries=0)
 
-def detect_filler_words(transcript_text: str) -> list:
+OPENAI_MODEL_ID = "gpt-4o-mini"  # or gpt-4o, gpt-3.5-turbo, etc.
 
-    # Split the transcript into chunks based on sentence-terminating punctuation
-    sentence_chunks = re.split(r'(?<=[.!?]) +', transcript_text)
+# how many model calls a single analysis request may have in flight at once
+ANALYSIS_CONCURRENCY = int(os.getenv("ANALYSIS_CONCURRENCY", "4"))
 
-    detected_fillers = []
 
-    for i, chunk in enumerate(sentence_chunks):
-        chunk = sentence_chunks[i]
-        prompt = FILLER_PROMPT_TEMPLATE.format(text=chunk)
+async def complete(prompt: str, limit: Optional[asyncio.Semaphore] = None, label: str = "complete", **kwargs) -> str:
+    """
+    Sends a single-message prompt to the model and returns the reply text. `limit` caps how
+    many calls of the same request run at once; token usage is logged under `label`.
+    Raises LLMError if the call fails even after retries.
+    """
+    async with (limit or nullcontext()):
+        started = time.perf_counter()
+        response = await openai_llm.call(lambda: get_openai_client().chat.completions.create(
+            model=OPENAI_MODEL_ID,
+            messages=[{"role": "user", "content": prompt}],
+            **kwargs,
+        ))
+    usage = response.usage
+    token_usage.record(
+        OPENAI_MODEL_ID, label,
+        usage.prompt_tokens if usage else None, usage.completion_tokens if usage else None,
+        time.perf_counter() - started,
+    )
+    return response.choices[0].message.content
 
-        # Send the chunk to Mistral for filler word detection
-        #response = client.chat(model="llama3", messages=[{"role": "user", "content": prompt}])
-        # swap to gpt
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # or gpt-4o, gpt-3.5-turbo, etc.
-            messages=[{"role": "user", "content": prompt}]
-        )
-        
-        raw_content = response.choices[0].message.content.strip()
-        filler_word_dict = repair_json(raw_content)
 
-        try:
-            chunk_result = json.loads(filler_word_dict)
-        except Exception as e:
-            print(f"Failed to parse JSON from LLM response: {e}")
-            continue # retry
+async def complete_json(prompt: str, limit: Optional[asyncio.Semaphore] = None, label: str = "complete",
+                        schema: Optional[dict] = None) -> dict:
+    """
+    Like `complete`, but asks for a JSON object (matching `schema` when given, via structured
+    outputs) and returns it parsed. Raises LLMError if the reply still isn't a JSON object.
+    """
+    if schema:
+        response_format = {"type": "json_schema", "json_schema": {"name": label, "schema": schema}}
+    else:
+        response_format = {"type": "json_object"}
+    raw = await complete(prompt, limit, label, response_format=response_format)
+    try:
+        parsed = json.loads(repair_json(raw or ""))
+    except ValueError as e:
+        raise LLMError(f"{label}: model returned invalid JSON: {e}") from e
+    if not isinstance(parsed, dict):
+        raise LLMError(f"{label}: model returned {type(parsed).__name__}, not a JSON object")
+    return parsed
+
+
+def indexed_schema(key: str, **item_properties) -> dict:
+    # {key: [{"index": int, **item_properties}, ...]}, the answer to a numbered-items prompt
+    return {
+        "type": "object",
+        "properties": {
+            key: {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"index": {"type": "integer"}, **item_properties},
+                    "required": ["index"],
+                },
+            },
+        },
+        "required": [key],
+    }
+
 
+def observations_schema(*keys: str, **item_properties) -> dict:
+    # {key: [{**item_properties}, ...] for each key}, the answer to the full content prompts
+    item = {"type": "object", "properties": item_properties}
+    return {
+        "type": "object",
+        "properties": {key: {"type": "array", "items": item} for key in keys},
+        "required": list(keys),
+    }
 
-        # Map the detected filler words to the corresponding timestamps in the transcript
-        for entry in chunk_result:
-            detected_fillers.extend(entry["filler_phrases"])
 
-        time.sleep(0.3)
-    
-    return detected_fillers
+STRING = {"type": "string"}
+NULLABLE_STRING = {"type": ["string", "null"]}
+
+FILLER_RESPONSE_SCHEMA = indexed_schema("results", filler_phrases={"type": "array", "items": STRING})
+OUTLINE_FEEDBACK_SCHEMA = indexed_schema("feedback", issue=STRING, suggestion=STRING)
+SCRIPT_NOTES_SCHEMA = indexed_schema("notes", note=STRING)
+OUTLINE_ANALYSIS_SCHEMA = observations_schema(
+    "pros", "cons",
+    outline_point=STRING, timestamp=STRING, transcript_excerpt=STRING, issue=STRING, suggestion=STRING,
+)
+SCRIPT_ANALYSIS_SCHEMA = observations_schema(
+    "omissions", "additions", "paraphrases",
+    type=STRING, script_excerpt=NULLABLE_STRING, transcript_excerpt=NULLABLE_STRING, timestamp=STRING, note=STRING,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return count_tokens(text, OPENAI_MODEL_ID)
+
+
+def sentence_spans(transcript_text: str) -> List[Tuple[int, int]]:
+    # Split the transcript into chunks based on sentence-terminating punctuation,
+    # keeping the character offsets of each chunk
+    spans, start = [], 0
+    for m in re.finditer(r'(?<=[.!?]) +', transcript_text):
+        spans.append((start, m.start()))
+        start = m.end()
+    spans.append((start, len(transcript_text)))
+    return [(a, b) for a, b in spans if transcript_text[a:b].strip()]
+
+
+def split_sentences(transcript_text: str) -> List[str]:
+    return [transcript_text[a:b] for a, b in sentence_spans(transcript_text)]
+
+
+def pack_sentence_windows(sentences: List[str], max_tokens: int = FILLER_WINDOW_TOKENS,
+                          indices: Optional[List[int]] = None) -> List[List[int]]:
+    """
+    Groups consecutive sentence indices (all of them, or just `indices`) into windows that
+    each fit in `max_tokens`. A single sentence longer than the budget gets a window to itself.
+    """
+    windows = []
+    current, current_tokens = [], 0
+    for i in (range(len(sentences)) if indices is None else indices):
+        tokens = estimate_tokens(sentences[i])
+        if current and current_tokens + tokens > max_tokens:
+            windows.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        windows.append(current)
+    return windows
+
+
+async def detect_filler_words_in_window(sentences: List[str], window: List[int],
+                                        limit: Optional[asyncio.Semaphore] = None) -> Optional[Dict[int, List[str]]]:
+    """
+    Sends one window of numbered sentences to the model and maps its answer back onto
+    sentence indices. Returns None if the model call failed.
+    """
+    numbered = "\n".join(f"[{i}] {sentences[i]}" for i in window)
+    prompt = FILLER_PROMPT_TEMPLATE.format(text=numbered)
+
+    try:
+        window_result = await complete_json(prompt, limit, "filler", FILLER_RESPONSE_SCHEMA)
+    except LLMError as e:
+        # the window's ambiguous candidates just aren't counted
+        print(f"Filler detection failed for sentences {window[0]}-{window[-1]}: {e}")
+        return None
+
+    by_sentence = {}
+    allowed = set(window)
+    for entry in window_result.get("results", []):
+        if not isinstance(entry, dict):
+            continue
+        index = entry.get("index")
+        if index in allowed:
+            by_sentence.setdefault(index, []).extend(entry.get("filler_phrases", []))
+    return by_sentence
+
+
+async def detect_filler_words_by_sentence(transcript_text: str, indices: Optional[List[int]] = None,
+                                          limit: Optional[asyncio.Semaphore] = None) -> Tuple[Dict[int, List[str]], bool]:
+    """
+    Detects filler words with one model call per token-budgeted window of sentences rather
+    than one call per sentence, running the windows concurrently. Returns the filler phrases
+    found, keyed by sentence index, and whether any window failed. Pass `indices` to only
+    send some of the sentences.
+    """
+    sentences = split_sentences(transcript_text)
+
+    results = await asyncio.gather(*(
+        detect_filler_words_in_window(sentences, window, limit)
+        for window in pack_sentence_windows(sentences, indices=indices)
+    ))
+    by_sentence = {}
+    for window_result in results:
+        by_sentence.update(window_result or {})
+    return by_sentence, None in results
+
+
+async def detect_filler_matches(transcript_text: str, use_llm: bool = FILLER_LLM_FALLBACK,
+                                limit: Optional[asyncio.Semaphore] = None) -> Tuple[List[FillerMatch], bool]:
+    """
+    Finds filler words locally with the phrase matcher. Only sentences containing a
+    context-dependent candidate ("like", "so", ...) are sent to the model, and a candidate
+    is only counted if the model agrees it's a filler there. With `use_llm` off, ambiguous
+    candidates are skipped.
+
+    Also returns whether the result is degraded (some model calls failed, so their
+    candidates weren't counted).
+    """
+    matches = filler_matcher.find(transcript_text)
+    detected_fillers = [m for m in matches if not m.ambiguous]
+
+    ambiguous = [m for m in matches if m.ambiguous]
+    if not ambiguous or not use_llm:
+        return detected_fillers, False
+
+    # which sentence each ambiguous candidate falls in
+    spans = sentence_spans(transcript_text)
+    starts = [a for a, _ in spans]
+    candidates: Dict[int, List[FillerMatch]] = {}
+    for m in ambiguous:
+        index = max(bisect_right(starts, m.start) - 1, 0)
+        candidates.setdefault(index, []).append(m)
+
+    by_sentence, degraded = await detect_filler_words_by_sentence(
+        transcript_text, indices=sorted(candidates), limit=limit
+    )
+    for index, found in candidates.items():
+        confirmed = Counter(phrase.lower().strip() for phrase in by_sentence.get(index, []))
+        for m in found:
+            if confirmed[m.phrase] > 0:
+                confirmed[m.phrase] -= 1
+                detected_fillers.append(m)
+
+    return sorted(detected_fillers, key=lambda m: m.start), degraded
+
+
+async def detect_filler_words(transcript_text: str, use_llm: bool = FILLER_LLM_FALLBACK,
+                              limit: Optional[asyncio.Semaphore] = None) -> list:
+    fillers, _ = await detect_filler_matches(transcript_text, use_llm, limit)
+    return [m.phrase for m in fillers]
 
 
 def summarize_filler_word_counts(filler_words: List[Dict]) -> Dict[str, int]:
@@ -84,58 +306,264 @@ def summarize_filler_word_counts(filler_words: List[Dict]) -> Dict[str, int]:
     return dict(Counter(word.lower() for word in filler_words))
 
 
-# CONTENT ANALYSIS 
+def word_char_offsets(transcript: str, words: List[Dict]) -> List[int]:
+    """
+    Finds where each timestamped word starts in the transcript text.
+    """
+    offsets, pos = [], 0
+    for w in words:
+        found = transcript.find(w["word"], pos)
+        if found == -1:
+            found = pos
+        offsets.append(found)
+        pos = found + len(w["word"])
+    return offsets
 
-def analyze_content_outline(outline: str, transcript: str):
+
+def filler_timestamps(transcript: str, words: List[Dict], fillers: List[FillerMatch]) -> List[Dict]:
     """
-    Analyzes the content outline and transcript for coherence, flow, and engagement. Gives feedback to user on how
-    well what they are saying (the transcript) matches what they are trying to say (the outline).
+    Places each detected filler on the timeline using the word timestamps.
     """
-    prompt = content_analysis_outline_prompt.format(outline=outline, transcript=transcript)
+    offsets = word_char_offsets(transcript, words)
+    placed = []
+    for m in fillers:
+        i = max(bisect_right(offsets, m.start) - 1, 0)
+        placed.append({"phrase": m.phrase, "time": words[i]["start"]})
+    return placed
 
-    ## Feed into Llama 3 here
-    #response = client.chat(model="llama3", messages=[{"role": "user", "content": prompt}])
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}]
-    )
+# CONTENT ANALYSIS 
 
-    filtered_content = repair_json(response.choices[0].message.content)
+async def analyze_content_outline(outline: str, transcript: str, limit: Optional[asyncio.Semaphore] = None,
+                                  duration_sec: Optional[float] = None, word_timestamps: Optional[List[Dict]] = None):
+    """
+    Analyzes the content outline and transcript for coherence, flow, and engagement. Gives feedback to user on how
+    well what they are saying (the transcript) matches what they are trying to say (the outline).
+
+    Which points were covered (and where) is worked out locally with embeddings; the model
+    only sees the matched and unmatched points and writes the feedback.
+    """
+    coverage = None
+    if OUTLINE_EMBEDDINGS:
+        try:
+            coverage = await asyncio.to_thread(match_outline, outline, transcript, duration_sec, word_timestamps)
+        except (ImportError, OSError) as e:
+            # no embedding model available, let the model read everything
+            print(f"Outline embeddings unavailable, sending the full outline and transcript: {e}")
+
+    if coverage is None:
+        # long rehearsals are cut down to the parts of the transcript that relate to the outline
+        # compressing tokenizes the whole transcript, keep it off the event loop
+        prompt = content_analysis_outline_prompt.format(**await asyncio.to_thread(
+            fit_inputs, content_analysis_outline_prompt, {"outline": outline, "transcript": transcript}
+        ))
+
+        ## Feed into Llama 3 here
+        #response = client.chat(model="llama3", messages=[{"role": "user", "content": prompt}])
 
-    return json.loads(filtered_content)
+        try:
+            return await complete_json(prompt, limit, "content_outline", OUTLINE_ANALYSIS_SCHEMA)
+        except LLMError as e:
+            print(f"Outline analysis failed: {e}")
+            return {"pros": [], "cons": [], "error": str(e), "degraded": True}
+
+    points = coverage["points"]
+    prompt = outline_feedback_prompt.format(points="\n".join(
+        f"[{i}] " + json.dumps({key: point[key] for key in (
+            "outline_point", "covered", "timestamp", "transcript_excerpt", "out_of_order"
+        )})
+        for i, point in enumerate(points)
+    ))
+    feedback: Dict[int, dict] = {}
+    degraded = False
+    try:
+        answer = await complete_json(prompt, limit, "outline_feedback", OUTLINE_FEEDBACK_SCHEMA)
+        for entry in answer.get("feedback", []):
+            if isinstance(entry, dict) and isinstance(entry.get("index"), int):
+                feedback[entry["index"]] = entry
+    except LLMError as e:
+        # coverage is still reported, just without the model's suggestions
+        print(f"Outline feedback failed: {e}")
+        degraded = True
+
+    # same shape the model used to return, plus the local coverage numbers
+    pros, cons = [], []
+    for i, point in enumerate(points):
+        notes = feedback.get(i, {})
+        if point["covered"]:
+            pros.append({
+                "outline_point": point["outline_point"],
+                "timestamp": point["timestamp"],
+                "transcript_excerpt": point["transcript_excerpt"],
+                "suggestion": notes.get("suggestion", ""),
+            })
+        else:
+            cons.append({
+                "outline_point": point["outline_point"],
+                "timestamp": point["timestamp"],
+                "issue": notes.get("issue") or "This point was not found in the transcript.",
+                "suggestion": notes.get("suggestion", ""),
+            })
+    analysis = {
+        "pros": pros,
+        "cons": cons,
+        "coverage": {
+            "coverage": coverage["coverage"],
+            "in_order": coverage["in_order"],
+            "similarity": {point["outline_point"]: point["similarity"] for point in points},
+        },
+    }
+    if degraded:
+        analysis["degraded"] = True
+    return analysis
 
-def analyze_content_script(script: str, transcript: str):
+async def analyze_content_script(script: str, transcript: str, limit: Optional[asyncio.Semaphore] = None,
+                                 duration_sec: Optional[float] = None, word_timestamps: Optional[List[Dict]] = None):
     """
     Analyzes the content script and transcript for coherence, flow, and engagement. Gives feedback to user on how
     well what they are saying (the transcript) matches what they are supposed to say (the script).
-    """
-    prompt = content_analysis_script_prompt.format(script = script, transcript=transcript)
 
-    ## Feed into Llama 3 here
-    #response = client.chat(model="llama3", messages=[{"role": "user", "content": prompt}])
-    response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}]
-        )
+    The omissions, additions and paraphrases are found locally by aligning the two texts; the
+    model only writes the notes for those passages. If the speaker was too far off-script for
+    the alignment to mean much, the model compares the full texts instead.
+    """
+    # difflib on long scripts takes a while, keep it off the event loop
+    local = await asyncio.to_thread(align_script, script, transcript, duration_sec, word_timestamps)
+    coverage = local["alignment"]["coverage"]
 
-    filtered_content = repair_json(response.choices[0].message.content)
+    if coverage is not None and coverage < SCRIPT_ALIGNMENT_MIN_COVERAGE:
+        prompt = content_analysis_script_prompt.format(**await asyncio.to_thread(
+            fit_inputs, content_analysis_script_prompt, {"script": script, "transcript": transcript}
+        ))
 
-    return json.loads(filtered_content)
+        ## Feed into Llama 3 here
+        #response = client.chat(model="llama3", messages=[{"role": "user", "content": prompt}])
+        try:
+            return {
+                **await complete_json(prompt, limit, "content_script", SCRIPT_ANALYSIS_SCHEMA),
+                "alignment": local["alignment"],
+            }
+        except LLMError as e:
+            print(f"Script analysis failed, returning the alignment only: {e}")
+            return {**local, "error": str(e), "degraded": True}
+
+    flagged = [
+        entry
+        for kind in ("omissions", "additions", "paraphrases")
+        for entry in local[kind]
+    ][:MAX_NOTED_DIFFERENCES]
+    if not flagged:
+        return local
+
+    differences = "\n".join(
+        f"[{i}] " + json.dumps({
+            "type": entry["type"],
+            "script_excerpt": entry["script_excerpt"],
+            "transcript_excerpt": entry["transcript_excerpt"],
+        })
+        for i, entry in enumerate(flagged)
+    )
+    prompt = script_differences_prompt.format(differences=differences)
+    try:
+        notes = await complete_json(prompt, limit, "script_differences", SCRIPT_NOTES_SCHEMA)
+    except LLMError as e:
+        print(f"Script difference notes failed: {e}")
+        return {**local, "degraded": True}
+
+    for note in notes.get("notes", []):
+        if not isinstance(note, dict):
+            continue
+        index = note.get("index")
+        if isinstance(index, int) and 0 <= index < len(flagged):
+            flagged[index]["note"] = note.get("note", "")
+    return local
+
+
+def speech_rate_wpm(transcript: str, duration_sec: Optional[float] = None,
+                    word_timestamps: Optional[List[Dict]] = None) -> Optional[float]:
+    """
+    Words per minute. With `word_timestamps` (from the local Whisper path) the rate is measured
+    over the time actually spent speaking, otherwise over the whole video.
+    """
+    if word_timestamps:
+        speaking_sec = word_timestamps[-1]["end"] - word_timestamps[0]["start"]
+        return round((len(word_timestamps) / speaking_sec) * 60, 2) if speaking_sec > 0 else None
+    words = transcript.split()
+    return round((len(words) / duration_sec) * 60, 2) if duration_sec else None
 
 
-def analyze_transcript(transcript: str, outline: Optional[str] = None, script: Optional[str] = None, duration_sec: Optional[float] = None) -> dict:
-    words = transcript.split()
-    speech_rate = round((len(words) / duration_sec) * 60, 2) if duration_sec else None
-    output = {
-        "speech_rate_wpm": speech_rate,
-        "filler_words": summarize_filler_word_counts(detect_filler_words(transcript))
-    }
+async def transcript_stages(transcript: str, outline: Optional[str] = None, script: Optional[str] = None,
+                            word_timestamps: Optional[List[Dict]] = None,
+                            duration_sec: Optional[float] = None,
+                            video_path: Optional[Path] = None) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Runs the filler, outline, script and delivery analyses concurrently and yields (stage,
+    results) as each one finishes. Model calls are capped at ANALYSIS_CONCURRENCY per request.
+    If one stage fails, or the caller stops early or is cancelled, the other stages are
+    cancelled too.
 
+    A stage that had to fall back after a failed model call also sets "degraded": True in
+    its results, so callers know not to cache them.
+    """
+    limit = asyncio.Semaphore(ANALYSIS_CONCURRENCY)
+
+    async def filler_stage():
+        fillers, degraded = await detect_filler_matches(transcript, limit=limit)
+        results = {"filler_words": summarize_filler_word_counts([m.phrase for m in fillers])}
+        if word_timestamps:
+            results["filler_word_timestamps"] = filler_timestamps(transcript, word_timestamps, fillers)
+        if degraded:
+            results["degraded"] = True
+        return "filler", results
+
+    def with_degraded(key: str, analysis: dict) -> dict:
+        return {key: analysis, "degraded": True} if analysis.get("degraded") else {key: analysis}
+
+    async def outline_stage():
+        return "content_analysis", with_degraded("content_analysis", await analyze_content_outline(
+            outline, transcript, limit, duration_sec, word_timestamps
+        ))
+
+    async def script_stage():
+        return "script_analysis", with_degraded("script_analysis", await analyze_content_script(
+            script, transcript, limit, duration_sec, word_timestamps
+        ))
+
+    async def delivery_stage():
+        return "delivery", {"delivery_metrics": await asyncio.to_thread(
+            delivery_metrics, word_timestamps, duration_sec, video_path, len(transcript.split())
+        )}
+
+    stages = [filler_stage(), delivery_stage()]
     if outline:
-        output["content_analysis"] = analyze_content_outline(outline, transcript)
+        stages.append(outline_stage())
     if script:
-        output["script_analysis"] = analyze_content_script(script, transcript)
+        stages.append(script_stage())
+    tasks = [asyncio.create_task(stage) for stage in stages]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def analyze_transcript(transcript: str, outline: Optional[str] = None, script: Optional[str] = None,
+                             duration_sec: Optional[float] = None, word_timestamps: Optional[List[Dict]] = None,
+                             video_path: Optional[Path] = None) -> dict:
+    """
+    Runs the filler, outline and script analyses concurrently, so the whole thing takes about
+    as long as the slowest of them.
+
+    The output has "degraded": True if any analysis fell back after a failed model call.
+
+    With `word_timestamps` (from the local Whisper path) the speech rate is measured over the
+    time actually spent speaking, and fillers are placed on the timeline. With `video_path`
+    the delivery metrics include the volume envelope.
+    """
+    output = {"speech_rate_wpm": speech_rate_wpm(transcript, duration_sec, word_timestamps)}
+    async for _, results in transcript_stages(transcript, outline, script, word_timestamps, duration_sec, video_path):
+        output.update(results)
     
     print(output)
     
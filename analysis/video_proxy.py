@@ -0,0 +1,73 @@
+import asyncio
+import os
+from dataclasses import replace
+from typing import Dict
+
+import ffmpeg                  # ffmpeg-python wrapper
+
+from video_store import StoredVideo, video_store
+
+# body language feedback is per second at best, so a small, low frame rate copy is enough
+PROXY_HEIGHT = int(os.getenv("PROXY_HEIGHT", "360"))
+PROXY_FPS = int(os.getenv("PROXY_FPS", "5"))
+PROXY_CRF = int(os.getenv("PROXY_CRF", "32"))
+PROXY_SETTINGS = f"{PROXY_HEIGHT}p{PROXY_FPS}crf{PROXY_CRF}"
+
+# transcoding is CPU heavy, only run a couple at once
+_transcodes = asyncio.Semaphore(int(os.getenv("PROXY_CONCURRENCY", "2")))
+_locks: Dict[str, asyncio.Lock] = {}
+
+
+def transcode_proxy(src: str, dst: str):
+    (
+        ffmpeg
+        .input(src)
+        .output(
+            dst,
+            vf=f"scale=-2:'min({PROXY_HEIGHT},ih)'",
+            r=PROXY_FPS,
+            vcodec="libx264",
+            preset="veryfast",
+            crf=PROXY_CRF,
+            acodec="aac",
+            ac=1,
+            audio_bitrate="48k",
+            movflags="+faststart",
+        )
+        .overwrite_output()
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+
+
+async def get_proxy(video: StoredVideo) -> StoredVideo:
+    """
+    Returns a low resolution, low frame rate copy of the video (with its audio), made once per
+    content hash and kept next to the original in the video store, so it's evicted with it
+    (and counts towards the store's size limit). Falls back to the original if transcoding fails or doesn't make it smaller.
+    """
+    proxy_path = video.path.with_name(f"{video.sha256}.proxy-{PROXY_SETTINGS}.mp4")
+    lock = _locks.setdefault(proxy_path.name, asyncio.Lock())
+    async with lock:
+        if not proxy_path.exists():
+            tmp_path = proxy_path.with_name(proxy_path.name + ".part.mp4")
+            try:
+                async with _transcodes:
+                    await asyncio.to_thread(transcode_proxy, str(video.path), str(tmp_path))
+                tmp_path.replace(proxy_path)
+                video_store.track_derived(video.sha256, proxy_path.stat().st_size)
+            except (ffmpeg.Error, OSError) as e:
+                detail = e.stderr.decode(errors="ignore")[-500:] if isinstance(e, ffmpeg.Error) else e
+                print(f"Could not make proxy video, sending the original: {detail}")
+                tmp_path.unlink(missing_ok=True)
+                return video
+
+    size = proxy_path.stat().st_size
+    if size >= video.size:
+        return video
+    return replace(
+        video,
+        path=proxy_path,
+        sha256=f"{video.sha256}.proxy-{PROXY_SETTINGS}",
+        size=size,
+        mime_type="video/mp4",
+    )
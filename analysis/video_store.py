@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import mimetypes
+import os
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+import httpx
+from fastapi import HTTPException
+
+# where downloaded videos live, and how much disk they're allowed to take up
+VIDEO_STORE_DIR = Path(os.getenv("VIDEO_STORE_DIR", "/tmp/uploads/videos"))
+VIDEO_STORE_MAX_BYTES = int(os.getenv("VIDEO_STORE_MAX_BYTES", str(2 * 1024 ** 3)))  # 2 GB
+# largest single video we'll accept, and how much of it we hold in memory at a time while downloading
+MAX_VIDEO_BYTES = int(os.getenv("MAX_VIDEO_BYTES", str(1024 ** 3)))  # 1 GB
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024  # 1 MB
+
+
+@dataclass
+class StoredVideo:
+    url: str
+    path: Path
+    sha256: str      # content hash, also used as the file name
+    size: int
+    mime_type: str
+    etag: Optional[str] = None
+
+
+def guess_mime_type(url: str, reported: Optional[str] = None) -> str:
+    """
+    Prefer the content-type reported by the server, else guess from the extension.
+    """
+    if reported:
+        return reported
+    mime_type, _ = mimetypes.guess_type(url)
+    if not mime_type or not mime_type.startswith("video/"):
+        mime_type = "application/octet-stream"
+    return mime_type
+
+
+class VideoStore:
+    """
+    Shared, content-addressed store of downloaded videos.
+
+    Every endpoint asks the store for a URL instead of downloading it itself, so a rehearsal
+    is fetched from Cloudinary once and then read from disk by the transcript and body
+    language calls. Files are named by their sha256 so the same video behind two URLs is
+    only kept once, and the least recently used files are evicted once the store grows past
+    `max_bytes`. Videos that are currently being used by a request are never evicted.
+    """
+
+    def __init__(self, root: Path = VIDEO_STORE_DIR, max_bytes: int = VIDEO_STORE_MAX_BYTES,
+                 max_video_bytes: int = MAX_VIDEO_BYTES):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_video_bytes = max_video_bytes
+
+        self._by_url: Dict[str, StoredVideo] = {}
+        self._lru: "OrderedDict[str, int]" = OrderedDict()   # sha256 -> size, oldest first
+        self._pins: Dict[str, int] = {}                       # sha256 -> requests using it
+        self._url_locks: Dict[str, asyncio.Lock] = {}
+        self._total_bytes = 0
+        self._scan()
+
+    def _scan(self):
+        """
+        Picks up what a previous process left in the store directory, so it counts towards
+        (and is evicted under) the size limit. Unfinished downloads / transcodes are deleted.
+        """
+        files = []
+        for path in self.root.iterdir():
+            if not path.is_file():
+                continue
+            if ".part" in path.suffixes:
+                path.unlink(missing_ok=True)
+                continue
+            files.append(path)
+        # oldest first, grouped under the original video's hash with its proxies and segments
+        for path in sorted(files, key=lambda p: p.stat().st_mtime):
+            self._add_bytes(path.name.split(".")[0], path.stat().st_size)
+        self._evict()
+
+    @asynccontextmanager
+    async def open(self, url: str):
+        """
+        Yields a StoredVideo for `url`, downloading it only if it isn't stored yet.
+        The file is pinned (safe from eviction) until the block exits.
+        """
+        video = await self.get(url)
+        self._pins[video.sha256] = self._pins.get(video.sha256, 0) + 1
+        try:
+            yield video
+        finally:
+            self._pins[video.sha256] -= 1
+            if self._pins[video.sha256] == 0:
+                del self._pins[video.sha256]
+            self._evict()
+
+    async def get(self, url: str) -> StoredVideo:
+        # one lock per URL so concurrent requests for the same video share one download
+        lock = self._url_locks.setdefault(url, asyncio.Lock())
+        async with lock:
+            video = self._by_url.get(url)
+            if video and video.path.exists():
+                self._lru.move_to_end(video.sha256)
+                return video
+
+            video = await self._download(url)
+            self._by_url[url] = video
+            return video
+
+    async def _download(self, url: str) -> StoredVideo:
+        """
+        Streams the video to disk chunk by chunk, hashing as it goes, so memory use stays at
+        one chunk no matter how large the video is.
+        """
+        suffix = Path(httpx.URL(url).path).suffix or ".mp4"
+        tmp_path = self.root / f"{uuid.uuid4().hex}{suffix}.part"
+        hasher = hashlib.sha256()
+        size = 0
+
+        try:
+            async with httpx.AsyncClient(follow_redirects=True) as http_client:
+                async with http_client.stream("GET", url) as resp:
+                    if resp.status_code != 200:
+                        raise HTTPException(400, f"Failed to fetch video: {resp.status_code}")
+
+                    content_length = resp.headers.get("content-length")
+                    if content_length and int(content_length) > self.max_video_bytes:
+                        raise HTTPException(413, f"Video is larger than {self.max_video_bytes} bytes")
+
+                    with open(tmp_path, "wb") as f:
+                        async for chunk in resp.aiter_bytes(DOWNLOAD_CHUNK_BYTES):
+                            size += len(chunk)
+                            if size > self.max_video_bytes:
+                                raise HTTPException(413, f"Video is larger than {self.max_video_bytes} bytes")
+                            hasher.update(chunk)
+                            f.write(chunk)
+
+                    mime_type = guess_mime_type(url, resp.headers.get("content-type"))
+                    etag = resp.headers.get("etag")
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        sha256 = hasher.hexdigest()
+        path = self.root / f"{sha256}{suffix}"
+        if path.exists():
+            # same content already stored under another URL
+            tmp_path.unlink()
+        else:
+            tmp_path.replace(path)
+
+        self._track(sha256, size)
+        return StoredVideo(
+            url=url,
+            path=path,
+            sha256=sha256,
+            size=size,
+            mime_type=mime_type,
+            etag=etag,
+        )
+
+    def _track(self, sha256: str, size: int):
+        if sha256 in self._lru:
+            self._lru.move_to_end(sha256)
+            return
+        self._add_bytes(sha256, size)
+
+    def _add_bytes(self, sha256: str, size: int):
+        self._lru[sha256] = self._lru.get(sha256, 0) + size
+        self._lru.move_to_end(sha256)
+        self._total_bytes += size
+
+    def track_derived(self, sha256: str, size: int):
+        """
+        Counts a file made from a stored video (proxy, segment cut, ...) towards the size
+        limit. It's named after the original's hash, so it's evicted together with it.
+        """
+        self._add_bytes(sha256.split(".")[0], size)
+        self._evict()
+
+    def _evict(self):
+        for sha256 in list(self._lru):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if self._pins.get(sha256):
+                continue
+            size = self._lru.pop(sha256)
+            self._total_bytes -= size
+            for url, video in list(self._by_url.items()):
+                if video.sha256 == sha256:
+                    del self._by_url[url]
+            for path in self.root.glob(f"{sha256}.*"):
+                path.unlink(missing_ok=True)
+
+
+video_store = VideoStore()
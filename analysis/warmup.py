@@ -0,0 +1,68 @@
+import asyncio
+import os
+import time
+from typing import Callable, Dict, Iterable
+
+# failed loads are retried after WARMUP_RETRY_SEC, doubling up to WARMUP_RETRY_MAX_SEC
+WARMUP_RETRY_SEC = float(os.getenv("WARMUP_RETRY_SEC", "2"))
+WARMUP_RETRY_MAX_SEC = float(os.getenv("WARMUP_RETRY_MAX_SEC", "60"))
+
+
+class Warmup:
+    """
+    Tracks the heavy backends (SDK clients, local models) that load lazily. Each one is
+    registered with the function that loads it; `warm_up` loads them in worker threads after
+    the server has started (retrying failures with backoff until they load), and `status`
+    reports which ones are ready.
+    """
+
+    def __init__(self):
+        self.loaders: Dict[str, Callable] = {}
+        self.required: Dict[str, bool] = {}
+        self.state: Dict[str, dict] = {}
+
+    def register(self, name: str, loader: Callable, required: bool = True):
+        self.loaders[name] = loader
+        self.required[name] = required
+        self.state[name] = {"ready": False, "required": required, "load_sec": None, "error": None}
+
+    async def warm_up(self, names: Iterable[str] = None):
+        # by default only the backends this replica needs; optional ones load on first use
+        names = names or [name for name in self.loaders if self.required[name]]
+        await asyncio.gather(*(self._load(name) for name in names))
+
+    async def _load(self, name: str):
+        delay = WARMUP_RETRY_SEC
+        while not self._loaded(name):
+            start = time.perf_counter()
+            try:
+                await asyncio.to_thread(self.loaders[name])
+            except Exception as e:
+                self.state[name]["error"] = str(e)
+                print(f"Warm-up of {name} failed: {e}, retrying in {delay:g}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, WARMUP_RETRY_MAX_SEC)
+                continue
+            self.state[name]["load_sec"] = round(time.perf_counter() - start, 3)
+            self._mark_ready(name)
+
+    def _loaded(self, name: str) -> bool:
+        # the loaders are lru_cached, so one that's been loaded lazily by a request (after a
+        # failed or skipped warm-up) shows up in its cache
+        cache_info = getattr(self.loaders[name], "cache_info", None)
+        if not self.state[name]["ready"] and cache_info is not None and cache_info().currsize:
+            self._mark_ready(name)
+        return self.state[name]["ready"]
+
+    def _mark_ready(self, name: str):
+        self.state[name]["ready"] = True
+        self.state[name]["error"] = None
+
+    def ready(self) -> bool:
+        return all(self._loaded(name) for name in self.loaders if self.required[name])
+
+    def status(self) -> dict:
+        return {name: dict(self.state[name], ready=self._loaded(name)) for name in self.loaders}
+
+
+warmup = Warmup()
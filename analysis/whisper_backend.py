@@ -0,0 +1,57 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+import ffmpeg                  # ffmpeg-python wrapper
+import numpy as np
+
+WHISPER_MODEL_NAME = os.getenv("WHISPER_MODEL", "small")   # or "base", "medium", "large"
+SAMPLE_RATE = 16000
+
+# whisper is CPU/GPU heavy, so transcriptions run one at a time off the event loop
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("WHISPER_WORKERS", "1")))
+
+
+@lru_cache(maxsize=1)
+def get_whisper_model():
+    # imported here so torch and the model weights are only loaded when the local path is used
+    import whisper                 # OpenAI Whisper local
+    return whisper.load_model(WHISPER_MODEL_NAME)
+
+
+def extract_audio(video_path: Path) -> np.ndarray:
+    """
+    Decodes the video's audio track with ffmpeg into mono 16 kHz float32 samples in [-1, 1].
+    """
+    out, _ = (
+        ffmpeg
+        .input(str(video_path))
+        .output("pipe:", format="s16le", acodec="pcm_s16le", ac=1, ar=SAMPLE_RATE)
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+
+def transcribe_audio(audio: np.ndarray) -> dict:
+    """
+    Transcribes audio samples with Whisper, returning the text and a list of
+    {"word", "start", "end"} entries (seconds) for every word.
+    """
+    result = get_whisper_model().transcribe(audio, word_timestamps=True)
+    words = [
+        {"word": w["word"].strip(), "start": round(w["start"], 2), "end": round(w["end"], 2)}
+        for segment in result["segments"]
+        for w in segment.get("words", [])
+    ]
+    return {"text": result["text"].strip(), "words": words}
+
+
+def transcribe_video_file(video_path: Path) -> dict:
+    return transcribe_audio(extract_audio(video_path))
+
+
+async def transcribe_with_whisper(video_path: Path) -> dict:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, transcribe_video_file, video_path)
@@ -0,0 +1,115 @@
+# Index benchmark for the speech / rehearsal queries.
+#
+# Seeds a separate database with fake users, speeches and rehearsals, then runs the backend's
+# hot queries without indexes and again after creating the indexes from server/database.py,
+# printing each query's plan (COLLSCAN vs IXSCAN), documents examined and median latency.
+# The benchmark database is dropped afterwards unless --keep is passed.
+#
+#   python bench_indexes.py [--users 2000] [--speeches 5] [--rehearsals 4] [--db PublicSpeakingBench]
+import argparse
+import os
+import random
+import statistics
+import time
+
+from bson.objectid import ObjectId
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from server.database import INDEXES
+
+load_dotenv()
+
+
+def seed(db, users: int, speeches_per_user: int, rehearsals_per_speech: int) -> dict:
+    speeches, rehearsals = [], []
+    for u in range(users):
+        user_id = f"user-{u}"
+        for _ in range(speeches_per_user):
+            speech_id = ObjectId()
+            rehearsal_ids = [ObjectId() for _ in range(rehearsals_per_speech)]
+            speeches.append({
+                "_id": speech_id, "userId": user_id, "name": "Bench speech", "practiceTime": 0.0,
+                "rehearsals": rehearsal_ids, "thumbnailUrl": None,
+            })
+            for rehearsal_id in rehearsal_ids:
+                rehearsals.append({
+                    "_id": rehearsal_id, "speech": speech_id, "analysis": ["content"], "videoUrl": None,
+                    "date": f"{random.randint(1, 12):02d}/{random.randint(1, 28):02d}/2025",
+                    "deliveryAnalysis": {"filler_words": {"um": random.randint(0, 20)}},
+                })
+    db.speeches.insert_many(speeches, ordered=False)
+    db.rehearsals.insert_many(rehearsals, ordered=False)
+    return {"user": f"user-{users // 2}", "speech": speeches[len(speeches) // 2]["_id"]}
+
+
+def plan_stage(plan: dict) -> str:
+    # innermost stage of the winning plan (COLLSCAN / IXSCAN / ...)
+    while "inputStage" in plan:
+        plan = plan["inputStage"]
+    return plan["stage"]
+
+
+def measure(collection, query: dict, runs: int) -> dict:
+    explain = collection.find(query).explain()
+    stats = explain["executionStats"]
+    timings = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        list(collection.find(query))
+        timings.append((time.perf_counter() - t) * 1000)
+    return {
+        "plan": plan_stage(explain["queryPlanner"]["winningPlan"]),
+        "returned": stats["nReturned"],
+        "docs_examined": stats["totalDocsExamined"],
+        "keys_examined": stats["totalKeysExamined"],
+        "median_ms": round(statistics.median(timings), 2),
+    }
+
+
+def run_queries(db, targets: dict, runs: int) -> dict:
+    return {
+        "speeches by userId": measure(db.speeches, {"userId": targets["user"]}, runs),
+        "rehearsals by speech": measure(db.rehearsals, {"speech": targets["speech"]}, runs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--speeches", type=int, default=5, help="speeches per user")
+    parser.add_argument("--rehearsals", type=int, default=4, help="rehearsals per speech")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--db", default="PublicSpeakingBench")
+    parser.add_argument("--keep", action="store_true", help="don't drop the benchmark database")
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv("MONGODB_URL"))
+    client.drop_database(args.db)
+    db = client[args.db]
+    try:
+        t = time.perf_counter()
+        targets = seed(db, args.users, args.speeches, args.rehearsals)
+        print(f"seeded {db.speeches.count_documents({})} speeches and "
+              f"{db.rehearsals.count_documents({})} rehearsals in {time.perf_counter() - t:.1f}s\n")
+
+        before = run_queries(db, targets, args.runs)
+        t = time.perf_counter()
+        for collection, indexes in INDEXES.items():
+            db[collection].create_indexes(indexes)
+        print(f"created indexes in {time.perf_counter() - t:.1f}s\n")
+        after = run_queries(db, targets, args.runs)
+
+        for name in before:
+            print(name)
+            for label, result in (("  before", before[name]), ("  after ", after[name])):
+                print(f"{label}: {result['plan']:<8} returned {result['returned']:<4} "
+                      f"docs examined {result['docs_examined']:<7} keys examined {result['keys_examined']:<5} "
+                      f"median {result['median_ms']} ms")
+    finally:
+        if not args.keep:
+            client.drop_database(args.db)
+
+
+if __name__ == "__main__":
+    main()
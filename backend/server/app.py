@@ -1,10 +1,21 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from server.database import ensure_indexes, get_index_status
 from server.routes.speech import router as SpeechRouter
 from server.routes.rehearsal import router as RehearsalRouter
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # build any missing indexes in the background so startup doesn't wait on them
+    index_task = asyncio.create_task(ensure_indexes())
+    yield
+    index_task.cancel()
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -23,3 +34,9 @@ app.include_router(RehearsalRouter, tags=["Rehearsal"], prefix="/rehearsal")
 async def read_root():
     return {"message": "Welcome to this fantastic app!"}
 
+
+@app.get("/indexes", tags=["Root"])
+# build status of the indexes created at startup
+async def read_index_status():
+    return await get_index_status()
+
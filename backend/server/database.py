@@ -1,6 +1,8 @@
 from dotenv import load_dotenv
 from bson.objectid import ObjectId
 import motor.motor_asyncio
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument
+from pymongo.errors import OperationFailure
 import os
 from datetime import datetime
 
@@ -8,6 +10,12 @@ load_dotenv()
 
 MONGO_URL = os.getenv("MONGODB_URL")
 
+# speeches per page on the home dashboard, and the most a client may ask for
+SPEECH_PAGE_SIZE = int(os.getenv("SPEECH_PAGE_SIZE", "24"))
+MAX_SPEECH_PAGE_SIZE = 100
+# most rehearsals fetched by one batch request
+MAX_REHEARSAL_BATCH = 200
+
 client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
 
 
@@ -15,6 +23,68 @@ database = client.get_database("PublicSpeaking")
 speech_collection = database.get_collection("speeches")
 rehearsal_collection = database.get_collection("rehearsals")
 
+# indexes
+
+# the indexes the queries below rely on, per collection
+INDEXES = {
+    "speeches": [
+        # a user's speeches, newest first
+        IndexModel([("userId", ASCENDING), ("_id", DESCENDING)], name="userId_id"),
+    ],
+    "rehearsals": [
+        # a speech's rehearsals in creation order (the batch endpoint's keyset on _id), and
+        # deleting them with the speech
+        IndexModel([("speech", ASCENDING), ("_id", ASCENDING)], name="speech_id"),
+    ],
+}
+
+# indexes earlier versions created that no query uses any more, dropped at startup
+# (speech_date sorted on the MM/DD/YYYY date string, which isn't chronological)
+OBSOLETE_INDEXES = {
+    "rehearsals": ["speech_date"],
+}
+
+# build status of each index: pending -> building -> ready / failed
+index_status = {
+    index.document["name"]: {"collection": collection, "keys": dict(index.document["key"]), "status": "pending"}
+    for collection, indexes in INDEXES.items()
+    for index in indexes
+}
+
+async def ensure_indexes():
+    # creating an index that already exists is a no-op, so this is safe to run on every startup
+    for collection, indexes in INDEXES.items():
+        names = [index.document["name"] for index in indexes]
+        for name in names:
+            index_status[name]["status"] = "building"
+        try:
+            await database.get_collection(collection).create_indexes(indexes)
+        except Exception as e:
+            print(f"Could not create indexes on {collection}: {e}")
+            for name in names:
+                index_status[name].update({"status": "failed", "error": str(e)})
+        else:
+            for name in names:
+                index_status[name]["status"] = "ready"
+
+    for collection, names in OBSOLETE_INDEXES.items():
+        for name in names:
+            try:
+                await database.get_collection(collection).drop_index(name)
+            except OperationFailure as e:
+                if e.code != 27:  # IndexNotFound, already gone
+                    print(f"Could not drop index {name} on {collection}: {e}")
+
+async def get_index_status() -> dict:
+    # what the bootstrap did, and which indexes the collections actually have
+    existing = {}
+    for collection in INDEXES:
+        try:
+            existing[collection] = [index["name"] async for index in database.get_collection(collection).list_indexes()]
+        except Exception as e:
+            existing[collection] = str(e)
+    return {"indexes": index_status, "existing": existing}
+
 # helpers
 
 async def connect_speech_rehearsal(speech_id: str, rehearsal_id: str):
@@ -37,16 +107,70 @@ def speech_helper(speech) -> dict:
         "thumbnailUrl": speech.get("thumbnailUrl"),
     }
 
-async def add_speech(speech_data: dict) -> dict:
-    speech = await speech_collection.insert_one(speech_data)
-    new_speech = await speech_collection.find_one({"_id": speech.inserted_id})
-    return speech_helper(new_speech)
+# only what a speech card shows, with the rehearsal ids counted on the server
+SPEECH_CARD_PROJECTION = {
+    "userId": 1,
+    "name": 1,
+    "practiceTime": 1,
+    "thumbnailUrl": 1,
+    "rehearsalCount": {"$size": {"$ifNull": ["$rehearsals", []]}},
+}
+
+def speech_card_helper(speech) -> dict:
+    return {
+        "id": str(speech["_id"]),
+        "userId": str(speech["userId"]),
+        "name": speech.get("name", "Untitled Speech"),
+        "practiceTime": speech.get("practiceTime", 0.0),
+        "rehearsalCount": speech.get("rehearsalCount", 0),
+        "thumbnailUrl": speech.get("thumbnailUrl"),
+    }
+
+async def add_speech_with_rehearsal(speech_data: dict, rehearsal_data: dict) -> tuple:
+    # both ids are made up front, so each document is written already linked to the other
+    speech_id, rehearsal_id = ObjectId(), ObjectId()
+    speech_data = {
+        **speech_data,
+        "_id": speech_id,
+        "rehearsals": [*(ObjectId(r) for r in speech_data.get("rehearsals", [])), rehearsal_id],
+    }
+    rehearsal_data = {**rehearsal_data, "_id": rehearsal_id, "speech": speech_id}
+
+    async def insert_both(session=None):
+        await speech_collection.insert_one(speech_data, session=session)
+        await rehearsal_collection.insert_one(rehearsal_data, session=session)
+
+    async with await client.start_session() as session:
+        try:
+            # all or nothing, so a failure can't leave a speech without its rehearsal
+            await session.with_transaction(insert_both)
+        except OperationFailure as e:
+            # standalone servers (e.g. a local mongod) don't support transactions
+            if e.code != 20:  # IllegalOperation
+                raise
+            try:
+                await insert_both()
+            except Exception:
+                await speech_collection.delete_one({"_id": speech_id})
+                raise
 
-async def retrieve_speeches(user_id: str) -> list:
-    speeches = []
-    async for speech in speech_collection.find({"userId": user_id}):
-        speeches.append(speech_helper(speech))
-    return speeches
+    return speech_helper(speech_data), rehearsal_helper(rehearsal_data)
+
+async def retrieve_speech_page(user_id: str, limit: int = SPEECH_PAGE_SIZE, cursor: str = None) -> tuple:
+    # newest first, keyset paginated on _id (uses the userId_id index); `cursor` is the id of
+    # the last speech of the previous page. Raises InvalidId for a malformed cursor.
+    limit = max(1, min(limit, MAX_SPEECH_PAGE_SIZE))
+    query = {"userId": user_id}
+    if cursor:
+        query["_id"] = {"$lt": ObjectId(cursor)}
+
+    # one extra to know whether there's another page
+    speeches = [
+        speech_card_helper(speech)
+        async for speech in speech_collection.find(query, SPEECH_CARD_PROJECTION).sort("_id", DESCENDING).limit(limit + 1)
+    ]
+    next_cursor = speeches[limit - 1]["id"] if len(speeches) > limit else None
+    return speeches[:limit], next_cursor
 
 async def retrieve_speech(speech_id: str) -> dict:
     speech = await speech_collection.find_one({"_id": ObjectId(speech_id)})
@@ -57,32 +181,23 @@ async def retrieve_speech(speech_id: str) -> dict:
 async def update_speech(speech_id: str, data: dict) -> bool:
     if len(data) < 1:
         return False
-    speech = await speech_collection.find_one({"_id": ObjectId(speech_id)})
-    if speech:
-        updated_speech = await speech_collection.update_one({"_id": ObjectId(speech_id)}, {"$set": data})
-        if updated_speech:
-            return True
-        return False
+    updated_speech = await speech_collection.update_one({"_id": ObjectId(speech_id)}, {"$set": data})
+    return updated_speech.matched_count > 0
 
 async def delete_speech(speech_id: str) -> bool:  
-    speech = await speech_collection.find_one({"_id": ObjectId(speech_id)})
+    speech = await speech_collection.find_one_and_delete({"_id": ObjectId(speech_id)}, projection={"_id": 1})
     if speech:
         # delete all rehearsals associated with this speech
         await rehearsal_collection.delete_many({"speech": ObjectId(speech_id)})
-        # delete the speech
-        await speech_collection.delete_one({"_id": ObjectId(speech_id)})
         return True
     return False
 
 async def update_speech_name(speech_id: str, name: str) -> bool:
-    speech = await speech_collection.find_one({"_id": ObjectId(speech_id)})
-    if speech:
-        updated_speech = await speech_collection.update_one(
-            {"_id": ObjectId(speech_id)},
-            {"$set": {"name": name}}
-        )
-        return updated_speech.matched_count > 0
-    return False
+    updated_speech = await speech_collection.update_one(
+        {"_id": ObjectId(speech_id)},
+        {"$set": {"name": name}}
+    )
+    return updated_speech.matched_count > 0
 
 # rehearsal helpers
 
@@ -100,17 +215,65 @@ def rehearsal_helper(rehearsal) -> dict:
         "date": rehearsal.get("date", get_today_date())
     }
 
+# what the past rehearsals list shows, without the analysis blobs
+REHEARSAL_SUMMARY_PROJECTION = {
+    "analysis": 1,
+    "speech": 1,
+    "videoUrl": 1,
+    "thumbnailUrl": 1,
+    "duration": 1,
+    "date": 1,
+}
+
+def rehearsal_summary_helper(rehearsal) -> dict:
+    return {
+        "id": str(rehearsal["_id"]),
+        "analysis": rehearsal.get("analysis", []),
+        "speech": str(rehearsal.get("speech")),
+        "videoUrl": rehearsal.get("videoUrl"),
+        "thumbnailUrl": rehearsal.get("thumbnailUrl"),
+        "duration": rehearsal.get("duration"),
+        "date": rehearsal.get("date", get_today_date())
+    }
+
 async def add_rehearsal(rehearsal_data: dict) -> dict:
     rehearsal = await rehearsal_collection.insert_one(rehearsal_data)
-    new_rehearsal = await rehearsal_collection.find_one({"_id": rehearsal.inserted_id})
-    return rehearsal_helper(new_rehearsal)
+    return rehearsal_helper({**rehearsal_data, "_id": rehearsal.inserted_id})
 
 async def retrieve_rehearsals(speech_id: str) -> list:
     rehearsals = []
-    async for rehearsal in rehearsal_collection.find({"speech": speech_id}):
+    # `speech` is stored as an ObjectId, querying with the string matches nothing
+    async for rehearsal in rehearsal_collection.find({"speech": ObjectId(speech_id)}):
         rehearsals.append(rehearsal_helper(rehearsal))
     return rehearsals
 
+async def retrieve_rehearsal_batch(rehearsal_ids: list = None, speech_id: str = None, view: str = "summary",
+                                   cursor: str = None) -> tuple:
+    # the given rehearsals (in the order asked for) or a speech's rehearsals (oldest first,
+    # MAX_REHEARSAL_BATCH at a time) in one query; "summary" leaves out the analysis results.
+    # For a speech, `cursor` is the id of the last rehearsal of the previous batch, and the
+    # returned next cursor is None once there are no more. Raises InvalidId for malformed ids.
+    if rehearsal_ids is not None:
+        ids = [ObjectId(rehearsal_id) for rehearsal_id in rehearsal_ids]
+        query = {"_id": {"$in": ids}}
+    else:
+        query = {"speech": ObjectId(speech_id)}
+        if cursor:
+            query["_id"] = {"$gt": ObjectId(cursor)}
+
+    projection = REHEARSAL_SUMMARY_PROJECTION if view == "summary" else None
+    helper = rehearsal_summary_helper if view == "summary" else rehearsal_helper
+    # one extra to know whether the speech has more
+    cursor = rehearsal_collection.find(query, projection).sort("_id", ASCENDING).limit(MAX_REHEARSAL_BATCH + 1)
+    rehearsals = [helper(rehearsal) async for rehearsal in cursor]
+    next_cursor = rehearsals[MAX_REHEARSAL_BATCH - 1]["id"] if len(rehearsals) > MAX_REHEARSAL_BATCH else None
+    rehearsals = rehearsals[:MAX_REHEARSAL_BATCH]
+
+    if rehearsal_ids is not None:
+        position = {rehearsal_id: i for i, rehearsal_id in enumerate(rehearsal_ids)}
+        rehearsals.sort(key=lambda rehearsal: position.get(rehearsal["id"], len(position)))
+    return rehearsals, next_cursor
+
 async def retrieve_rehearsal(rehearsal_id: str) -> dict:
     rehearsal = await rehearsal_collection.find_one({"_id": ObjectId(rehearsal_id)})
     if rehearsal:
@@ -127,42 +290,45 @@ def get_thumbnail_url(video_url: str) -> str:
 async def update_rehearsal(rehearsal_id: str, data: dict) -> bool:
     if len(data) < 1:
         return False
-    rehearsal = await rehearsal_collection.find_one({"_id": ObjectId(rehearsal_id)})    
-    if rehearsal:
-        # if we're updating the video URL and have duration, update practice time and thumbnail
-        if "videoUrl" in data and data["videoUrl"]:
-            # update the speech's practice time using the provided duration
-            if "duration" in data and data["duration"]:
-                await speech_collection.update_one(
-                    {"_id": ObjectId(rehearsal["speech"])},
-                    {"$inc": {"practiceTime": data["duration"]}}
-                )
-            
-            # update the speech's thumbnail URL
-            thumbnail_url = get_thumbnail_url(data["videoUrl"])
-            if thumbnail_url:
-                await speech_collection.update_one(
-                    {"_id": ObjectId(rehearsal["speech"])},
-                    {"$set": {"thumbnailUrl": thumbnail_url}}
-                )
-                data["thumbnailUrl"] = thumbnail_url
-        
-        updated_rehearsal = await rehearsal_collection.update_one(
-            {"_id": ObjectId(rehearsal_id)}, 
-            {"$set": data}
-        )
-        return updated_rehearsal.matched_count > 0
-    return False
+
+    # if we're updating the video URL (and have a duration), the speech's thumbnail and
+    # practice time change with it
+    speech_update = {}
+    if "videoUrl" in data and data["videoUrl"]:
+        # update the speech's practice time using the provided duration
+        if "duration" in data and data["duration"]:
+            speech_update["$inc"] = {"practiceTime": data["duration"]}
+
+        # update the speech's thumbnail URL
+        thumbnail_url = get_thumbnail_url(data["videoUrl"])
+        if thumbnail_url:
+            speech_update["$set"] = {"thumbnailUrl": thumbnail_url}
+            data["thumbnailUrl"] = thumbnail_url
+
+    # updates the rehearsal and returns its speech id in the same round trip
+    rehearsal = await rehearsal_collection.find_one_and_update(
+        {"_id": ObjectId(rehearsal_id)},
+        {"$set": data},
+        projection={"speech": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not rehearsal:
+        return False
+    if speech_update:
+        await speech_collection.update_one({"_id": ObjectId(rehearsal["speech"])}, speech_update)
+    return True
     
 async def delete_rehearsal(rehearsal_id: str) -> bool:
-    rehearsal = await rehearsal_collection.find_one({"_id": ObjectId(rehearsal_id)})
+    # delete the rehearsal, getting back which speech it belonged to
+    rehearsal = await rehearsal_collection.find_one_and_delete(
+        {"_id": ObjectId(rehearsal_id)},
+        projection={"speech": 1},
+    )
     if rehearsal:
         # remove the rehearsal from the speech's rehearsals array
         await speech_collection.update_one(
             {"_id": ObjectId(rehearsal["speech"])},
             {"$pull": {"rehearsals": ObjectId(rehearsal_id)}}
         )
-        # delete the rehearsal
-        await rehearsal_collection.delete_one({"_id": ObjectId(rehearsal_id)})
         return True
     return False
@@ -40,6 +40,14 @@ class UpdateRehearsalSchema(BaseModel):
         arbitrary_types_allowed = True
         json_encoders = {ObjectId: str}
 
+class RehearsalBatchSchema(BaseModel):
+    # either the rehearsal ids to fetch, or a speech whose rehearsals to fetch
+    ids: Optional[List[str]] = None
+    speechId: Optional[str] = None
+    view: Literal["summary", "full"] = "summary"
+    # with speechId: the nextCursor of the previous batch
+    cursor: Optional[str] = None
+
 def ResponseModel(data, message):
     data.update({"code": 200, "message": message})
     return data
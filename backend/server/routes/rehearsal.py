@@ -1,3 +1,4 @@
+from bson.errors import InvalidId
 from fastapi import APIRouter, Body
 from fastapi.encoders import jsonable_encoder
 
@@ -5,11 +6,19 @@ from server.database import (
     update_rehearsal,
     add_rehearsal,
     retrieve_rehearsal,
+    retrieve_rehearsal_batch,
+    MAX_REHEARSAL_BATCH,
     delete_rehearsal,
     connect_speech_rehearsal,
 )
 
-from server.models.rehearsal import UpdateRehearsalSchema, ResponseModel, ErrorResponseModel, RehearsalSchema
+from server.models.rehearsal import (
+    UpdateRehearsalSchema,
+    ResponseModel,
+    ErrorResponseModel,
+    RehearsalSchema,
+    RehearsalBatchSchema,
+)
 
 router = APIRouter()
 
@@ -71,6 +80,30 @@ async def add_rehearsal_data(rehearsal: RehearsalSchema = Body(...)):
     }
     return ResponseModel(data, "Rehearsal added successfully.")
 
+@router.post("/batch", response_description="Rehearsals fetched from the database")
+# many rehearsals in one request, by ids or by speech; view "summary" leaves out the analyses.
+# A speech's rehearsals come MAX_REHEARSAL_BATCH at a time: pass the returned nextCursor to get the rest
+async def get_rehearsal_batch(req: RehearsalBatchSchema = Body(...)):
+    if (req.ids is None) == (req.speechId is None):
+        return ErrorResponseModel("Invalid request", 400, "Exactly one of ids or speechId is required")
+    if req.ids is not None and len(req.ids) > MAX_REHEARSAL_BATCH:
+        return ErrorResponseModel("Invalid request", 400, f"At most {MAX_REHEARSAL_BATCH} ids per request")
+    if req.ids is not None and req.cursor is not None:
+        return ErrorResponseModel("Invalid request", 400, "cursor only applies to speechId")
+    try:
+        rehearsals, next_cursor = await retrieve_rehearsal_batch(req.ids, req.speechId, req.view, req.cursor)
+    except InvalidId:
+        return ErrorResponseModel("Invalid request", 400, "Invalid rehearsal, speech or cursor id")
+    data = {
+        "rehearsals": rehearsals
+    }
+    if req.ids is not None:
+        found = {rehearsal["id"] for rehearsal in rehearsals}
+        data["missing"] = [id for id in req.ids if id not in found]
+    else:
+        data["nextCursor"] = next_cursor
+    return ResponseModel(data, "Rehearsals fetched successfully.")
+
 @router.get("/{id}", response_description="Rehearsal fetched from the database")
 async def get_rehearsal_data(id: str):
     rehearsal = await retrieve_rehearsal(id)
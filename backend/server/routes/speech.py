@@ -1,13 +1,15 @@
+from typing import Optional
+
+from bson.errors import InvalidId
 from fastapi import APIRouter, Body
 from fastapi.encoders import jsonable_encoder
 
 from server.database import (
-    add_speech,
-    add_rehearsal,
-    connect_speech_rehearsal,
+    add_speech_with_rehearsal,
     delete_speech,
-    retrieve_speeches,
+    retrieve_speech_page,
     retrieve_speech,
+    SPEECH_PAGE_SIZE,
     update_speech_name,
 )
 from server.models.speech import (
@@ -30,10 +32,9 @@ async def get_speech_data(id: str):
 @router.post("/", response_description="Speech added into the database")
 async def add_speech_data(speech: SpeechSchema = Body(...), rehearsal: RehearsalSchema = Body(...)):
     speech_data = jsonable_encoder(speech)
-    new_speech = await add_speech(speech_data)
     rehearsal_data = jsonable_encoder(rehearsal)
-    new_rehearsal = await add_rehearsal(rehearsal_data)
-    await connect_speech_rehearsal(new_speech["id"], new_rehearsal["id"])
+    # the rehearsal's `speech` field is replaced by the new speech's id
+    new_speech, new_rehearsal = await add_speech_with_rehearsal(speech_data, rehearsal_data)
     data = {
         "speech": new_speech,
         "rehearsal": new_rehearsal
@@ -48,11 +49,16 @@ async def delete_speech_data(id: str):
     return ErrorResponseModel("An error occurred.", 404, "Speech not found")
 
 @router.get("/user/{id}", response_description="Speeches retrieved by user id from the database")
-async def get_speeches_by_user(id: str):
-    speeches = await retrieve_speeches(id)
+# one page of the user's speeches, newest first; pass the returned nextCursor to get the next page
+async def get_speeches_by_user(id: str, limit: int = SPEECH_PAGE_SIZE, cursor: Optional[str] = None):
+    try:
+        speeches, next_cursor = await retrieve_speech_page(id, limit, cursor)
+    except InvalidId:
+        return ErrorResponseModel("Invalid request", 400, "Invalid cursor")
     if speeches:    
         data = {
-            "speeches": speeches
+            "speeches": speeches,
+            "nextCursor": next_cursor
         }
         return ResponseModel(data, "Speeches successfully retrieved.")
     return ErrorResponseModel("An error occurred.", 404, "Speeches not found")
@@ -1,6 +1,6 @@
 import { useNavigate } from "react-router-dom";
 import axios from "axios";
-import type { Speech } from "../utils/speechService";
+import type { SpeechListItem } from "../utils/speechService";
 import { addSpeech } from "../utils/auth";
 import { Trash2, Pencil } from "lucide-react";
 import {
@@ -16,10 +16,12 @@ import { useState } from "react";
 
 function SpeechCard({
   speech,
-  onSpeechUpdate,
+  onRename,
+  onDelete,
 }: {
-  speech: Speech;
-  onSpeechUpdate?: () => void;
+  speech: SpeechListItem;
+  onRename?: (name: string) => void;
+  onDelete?: () => void;
 }) {
   // TODO: implement later
   // const [loading, setLoading] = useState(true);
@@ -41,8 +43,8 @@ function SpeechCard({
   const handleDelete = async () => {
     try {
       await axios.delete(`http://localhost:8000/speech/${speech.id}`);
-      if (onSpeechUpdate) {
-        onSpeechUpdate(); // refresh the speeches list
+      if (onDelete) {
+        onDelete(); // drop it from the speeches list
       }
       setIsDeleteOpen(false);
     } catch (error) {
@@ -56,8 +58,8 @@ function SpeechCard({
         name: speechName,
       });
       setIsEditing(false);
-      if (onSpeechUpdate) {
-        onSpeechUpdate(); // refresh the speeches list
+      if (onRename) {
+        onRename(speechName); // update it in the speeches list
       }
     } catch (error) {
       console.error("Error renaming speech:", error);
@@ -144,8 +146,8 @@ function SpeechCard({
           </div>
           <div className="flex flex-col">
             <p className="text-sm">
-              {speech.rehearsals.length} rehearsal
-              {speech.rehearsals.length !== 1 ? "s" : ""}
+              {speech.rehearsalCount} rehearsal
+              {speech.rehearsalCount !== 1 ? "s" : ""}
             </p>
             <p className="text-sm">
               {(speech.practiceTime / 60).toFixed(1)} minutes of practice
@@ -3,7 +3,7 @@ import { useNavigate } from "react-router-dom";
 import axios from "axios";
 import SpeechCard from "../components/SpeechCard";
 import { getUserId, addSpeech, addRehearsal } from "../utils/auth";
-import type { Speech } from "../utils/speechService";
+import type { SpeechListItem } from "../utils/speechService";
 import logo from "../assets/speak-full.svg";
 import {
   Dialog,
@@ -18,20 +18,26 @@ import Loading from "./Loading";
 
 function Home() {
   const navigate = useNavigate();
-  const [speeches, setSpeeches] = useState<Speech[]>([]);
+  const [speeches, setSpeeches] = useState<SpeechListItem[]>([]);
   const [speechName, setSpeechName] = useState("Untitled Speech");
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
-  const fetchSpeeches = async () => {
+  // loads the first page of speeches, or the next one when `cursor` is given
+  const fetchSpeeches = async (cursor?: string) => {
     try {
       const userId = getUserId();
       const response = await axios.get(
         `http://localhost:8000/speech/user/${userId}`,
+        { params: cursor ? { cursor } : {} },
       );
       if (response.data.speeches) {
-        setSpeeches(response.data.speeches.map((speech: Speech) => speech));
-      } else {
+        const page: SpeechListItem[] = response.data.speeches;
+        setSpeeches((prev) => (cursor ? [...prev, ...page] : page));
+        setNextCursor(response.data.nextCursor ?? null);
+      } else if (!cursor) {
         setSpeeches([]);
+        setNextCursor(null);
       }
     } catch (err) {
       console.error("Error fetching speeches:", err);
@@ -113,9 +119,25 @@ function Home() {
             <SpeechCard
               key={speech.id}
               speech={speech}
-              onSpeechUpdate={fetchSpeeches}
+              // updated in place, so pages loaded with "load more" stay loaded
+              onRename={(name) =>
+                setSpeeches((prev) =>
+                  prev.map((s) => (s.id === speech.id ? { ...s, name } : s)),
+                )
+              }
+              onDelete={() =>
+                setSpeeches((prev) => prev.filter((s) => s.id !== speech.id))
+              }
             />
           ))}
+          {nextCursor && (
+            <button
+              className="col-span-3 justify-self-center"
+              onClick={() => fetchSpeeches(nextCursor)}
+            >
+              load more
+            </button>
+          )}
         </div>
       )}
     </div>
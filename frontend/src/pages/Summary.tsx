@@ -23,14 +23,21 @@ function Summary() {
         );
         setSpeech(response.data);
 
-        // fetch each rehearsal's full data
-        const rehearsalPromises = response.data.rehearsals.map((id: string) =>
-          axios.get(`http://localhost:8000/rehearsal/${id}`),
-        );
-        const rehearsalResponses = await Promise.all(rehearsalPromises);
-        const rehearsalData = rehearsalResponses.map((res) => res.data);
-        console.log(rehearsalData);
-        setRehearsals(rehearsalData);
+        // fetch the rehearsals' summaries (no analysis results) a batch at a time
+        const summaries: Rehearsal[] = [];
+        let cursor: string | null = null;
+        do {
+          const rehearsalResponse = await axios.post<{
+            rehearsals?: Rehearsal[];
+            nextCursor?: string | null;
+          }>(
+            "http://localhost:8000/rehearsal/batch",
+            { speechId, view: "summary", cursor },
+          );
+          summaries.push(...(rehearsalResponse.data.rehearsals ?? []));
+          cursor = rehearsalResponse.data.nextCursor ?? null;
+        } while (cursor);
+        setRehearsals(summaries);
       } catch (err) {
         console.error("Error fetching speech:", err);
       } finally {
@@ -7,3 +7,12 @@ export interface Speech {
   rehearsals: Rehearsal[];
   thumbnailUrl: string;
 }
+
+// a speech as the paginated speech list returns it: a count instead of the rehearsals
+export interface SpeechListItem {
+  id: string;
+  name: string;
+  practiceTime: number;
+  rehearsalCount: number;
+  thumbnailUrl: string | null;
+}